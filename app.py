@@ -1,31 +1,541 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, Response
 import json
 import os
-from datetime import datetime
+import gzip
+import hashlib
+import re
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from datetime import datetime, date, timedelta
+
+import snapshots
+import metrics
+import timeline
+from game_record import SCL, current_day  # mismo día deportivo que games_today (06:00–05:59)
+
+try:
+    import brotli  # opcional: pip install brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 CACHE_FILE = "standings_cache.json"
+REFRESH_METRICS_FILE = "refresh_metrics.json"  # lo escribe update_cache.py tras cada refresh
+GAMES_INDEX_FILE = "games_index.json"           # juegos por día (update_cache.py) → /api/games
+GAMES_MAX_RANGE_DAYS = 62
+TIMELINE_FILE = "standings_timeline.json"       # W/L por hora (update_cache.py) → /api/standings
+API_CACHE_CONTROL = "public, max-age=30, must-revalidate"
+STATIC_PAGE_FILE = "standings.html"  # "/" pre-renderizada por update_cache.py (+ .gz/.br)
+PAGE_CACHE_CONTROL = "public, no-cache"  # siempre revalida (ETag/Last-Modified → 304)
+
+# --- Varias ligas (ver leagues.py) ---
+# La liga por defecto es CACHE_FILE; cada leagues/<id>.json publica standings_cache.<id>.json.
+DEFAULT_LEAGUE = os.getenv("DEFAULT_LEAGUE", "principal")
+LEAGUES_DIR = os.getenv("LEAGUES_DIR", "leagues")
+LEAGUE_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+
+# --- /api/stream (Server-Sent Events) ---
+# Con gthread cada conexión SSE ocupa un hilo del worker: se limita la cantidad por
+# worker (el resto recibe 503 y el navegador sigue con polling) y cada stream se
+# cierra tras STREAM_MAX_SECONDS (EventSource reconecta solo). Con un worker async
+# (gunicorn -k gevent) se puede subir STREAM_MAX_CLIENTS sin problema.
+STREAM_MAX_CLIENTS = int(os.getenv("STREAM_MAX_CLIENTS", "2"))
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "2"))
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_MAX_SECONDS = int(os.getenv("STREAM_MAX_SECONDS", "300"))
+_stream_slots = threading.BoundedSemaphore(STREAM_MAX_CLIENTS)
+
+# --- Refresher embebido (EMBEDDED_REFRESHER=1) ---
+# Cada worker arranca un hilo que intenta quedarse con el lock de refresh
+# (refresh_lock.py): refresca uno solo, los demás (y update_cache.py, si también
+# corre) esperan su turno. Mientras tanto se sigue sirviendo el último snapshot,
+# aunque esté viejo. No usar gunicorn --preload (los hilos no sobreviven al fork).
+EMBEDDED_REFRESHER = os.getenv("EMBEDDED_REFRESHER") == "1"
+NOT_READY_RETRY_AFTER = 30
+
+
+class PayloadCache:
+    """
+    Payload de /api/full en memoria, ya serializado a bytes (+ variantes gzip/br)
+    y con su ETag. Sólo se vuelve a leer el archivo si cambia su inode/mtime/tamaño:
+    una request normal cuesta un os.stat y copiar bytes, no un json.load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sig = None
+        self._entry = None
+
+    def get(self):
+        st = os.stat(self.path)  # FileNotFoundError si aún no existe
+        sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if sig != self._sig:
+            with self._lock:
+                if sig != self._sig:
+                    try:
+                        self._entry = self._load(st)
+                    except ValueError:
+                        # Archivo a medio escribir: seguir sirviendo lo último válido
+                        if self._entry is None:
+                            raise
+                        return self._entry
+                    self._sig = sig
+        return self._entry
+
+    def _load(self, st):
+        # Snapshot vigente; si está corrupto, el anterior válido de snapshots/
+        data = snapshots.load_latest(self.path)
+        # Marca de tiempo de la última actualización (el updater ya la trae en hora Chile)
+        data.setdefault("last_updated", datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S"))
+        entry = _encode_entry(data)
+        entry.update({
+            "data": data,
+            "mtime": st.st_mtime,
+            "version": data.get("version"),
+            "hash": data.get("hash"),
+            "last_updated": data.get("last_updated"),
+            "deltas": {},  # since -> entry codificado (ver /api/delta)
+            "views": {},   # (vista, parámetros) -> entry codificado (/api/games, /api/standings)
+        })
+        return entry
+
+
+class StaticPageCache(PayloadCache):
+    """
+    La página "/" que publica el updater (static_page.py), en memoria con sus variantes
+    .gz/.br ya comprimidas. Si una variante no corresponde al .html (se leyó entre dos
+    escrituras) se comprime aquí, una vez por snapshot.
+    """
+
+    def _load(self, st):
+        with open(self.path, "rb") as f:
+            body = f.read()
+        variants = {"identity": body}
+        for enc, suffix, decompress in (("gzip", ".gz", gzip.decompress),
+                                        ("br", ".br", brotli.decompress if brotli else None)):
+            if decompress is None:
+                continue
+            try:
+                with open(self.path + suffix, "rb") as f:
+                    packed = f.read()
+                if decompress(packed) == body:
+                    variants[enc] = packed
+                    continue
+            except Exception:
+                pass
+            variants[enc] = gzip.compress(body, compresslevel=9) if enc == "gzip" else brotli.compress(body)
+        return {
+            "etag": '"%s"' % hashlib.sha256(body).hexdigest()[:32],
+            "variants": variants,
+            "mtime": st.st_mtime,
+            "last_modified": formatdate(st.st_mtime, usegmt=True),
+        }
+
+
+def _encode_entry(data):
+    """JSON compacto en bytes + variantes comprimidas + ETag fuerte."""
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=6)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body)
+    return {
+        "etag": '"%s"' % hashlib.sha256(body).hexdigest()[:32],
+        "variants": variants,
+    }
+
+
+_payload = PayloadCache(CACHE_FILE)
+_page = StaticPageCache(STATIC_PAGE_FILE)
+_games_index = PayloadCache(GAMES_INDEX_FILE)
+_timeline = PayloadCache(TIMELINE_FILE)
+_league_payloads = {
+    (DEFAULT_LEAGUE, CACHE_FILE): _payload,
+    (DEFAULT_LEAGUE, GAMES_INDEX_FILE): _games_index,
+    (DEFAULT_LEAGUE, TIMELINE_FILE): _timeline,
+}
+VIEWS_PER_ENTRY = 256
+_league_lock = threading.Lock()
+
+
+def _league_payload(league, base_file=CACHE_FILE):
+    """PayloadCache de un archivo de una liga; None si no existe la definición leagues/<id>.json."""
+    cache = _league_payloads.get((league, base_file))
+    if cache is not None:
+        return cache
+    if not LEAGUE_ID_RE.match(league) or not os.path.isfile(os.path.join(LEAGUES_DIR, f"{league}.json")):
+        return None
+    stem, ext = os.path.splitext(base_file)
+    with _league_lock:
+        return _league_payloads.setdefault((league, base_file), PayloadCache(f"{stem}.{league}{ext}"))
+
+
+def _start_embedded_refresher():
+    import update_cache  # standings/requests/sqlite sólo hacen falta en este modo
+    t = threading.Thread(target=update_cache.run_refresher, name="refresher", daemon=True)
+    t.start()
+    return t
+
+
+if EMBEDDED_REFRESHER:
+    _start_embedded_refresher()
+
+
+def _not_ready():
+    # Sin ningún snapshot todavía (primer deploy): el refresh ya está en camino
+    resp = jsonify({"error": "Data not available yet, please try again in a few minutes."})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(NOT_READY_RETRY_AFTER)
+    return resp
+
+
+def _pick_encoding(variants):
+    accepted = {}
+    for part in (request.headers.get("Accept-Encoding") or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for enc in ("br", "gzip"):
+        if enc in variants and accepted.get(enc, 0) > 0:
+            return enc
+    return "identity"
+
+
+def _etag_matches(etag):
+    inm = request.headers.get("If-None-Match")
+    if not inm:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _not_modified_since(mtime):
+    """If-Modified-Since (sólo se mira si no vino If-None-Match)."""
+    ims = request.headers.get("If-Modified-Since")
+    if not ims or request.headers.get("If-None-Match"):
+        return False
+    try:
+        return int(mtime) <= parsedate_to_datetime(ims).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+def _cached_response(entry, content_type, cache_control):
+    headers = {
+        "ETag": entry["etag"],
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if "last_modified" in entry:
+        headers["Last-Modified"] = entry["last_modified"]
+    if _etag_matches(entry["etag"]) or ("last_modified" in entry and _not_modified_since(entry["mtime"])):
+        return Response(status=304, headers=headers)
+    enc = _pick_encoding(entry["variants"])
+    if enc != "identity":
+        headers["Content-Encoding"] = enc
+    return Response(entry["variants"][enc], status=200, headers=headers, content_type=content_type)
+
+def _cached_json_response(entry):
+    return _cached_response(entry, "application/json; charset=utf-8", API_CACHE_CONTROL)
 
 @app.route("/")
 def index():
-    return render_template("index.html")
+    """
+    Página pre-renderizada por el updater (tabla + juegos ya en el HTML, una sola request).
+    Si todavía no existe, la plantilla de siempre (se arma con /api/full en el navegador).
+    """
+    try:
+        entry = _page.get()
+    except Exception:  # FileNotFoundError: primer deploy / updater sin publicar aún
+        return render_template("index.html")
+    return _cached_response(entry, "text/html; charset=utf-8", PAGE_CACHE_CONTROL)
 
 @app.route("/api/full")
 def api_full():
-    if not os.path.exists(CACHE_FILE):
-        return jsonify({"error": "Data not available yet, please try again in a few minutes."}), 503
+    try:
+        entry = _payload.get()
+    except FileNotFoundError:
+        return _not_ready()
+    except Exception as e:
+        return jsonify({"error": f"Failed to read cached data: {e}"}), 500
+    return _cached_json_response(entry)
+
+@app.route("/api/<league>/full")
+def api_league_full(league):
+    cache = _league_payload(league)
+    if cache is None:
+        return jsonify({"error": f"Unknown league '{league}'."}), 404
+    try:
+        entry = cache.get()
+    except FileNotFoundError:
+        return _not_ready()
+    except Exception as e:
+        return jsonify({"error": f"Failed to read cached data: {e}"}), 500
+    return _cached_json_response(entry)
+
+def _parse_day(value, window):
+    """'YYYY-MM-DD', 'today' o 'yesterday' (día deportivo o calendario, hora Chile)."""
+    today = date.fromisoformat(current_day(window))
+    if value in (None, "", "today"):
+        return today
+    if value == "yesterday":
+        return today - timedelta(days=1)
+    return date.fromisoformat(value)
+
+def _games_response(cache):
+    try:
+        entry = cache.get()
+    except FileNotFoundError:
+        return _not_ready()
+    except Exception as e:
+        return jsonify({"error": f"Failed to read cached data: {e}"}), 500
+
+    index = entry["data"]
+    window = index.get("window", "sports")
+    try:
+        first = _parse_day(request.args.get("from"), window)
+        last = _parse_day(request.args.get("to"), window) if request.args.get("to") else first
+    except ValueError:
+        return jsonify({"error": "Invalid 'from'/'to' (use YYYY-MM-DD, today or yesterday)."}), 400
+    if last < first or (last - first).days >= GAMES_MAX_RANGE_DAYS:
+        return jsonify({"error": f"Invalid range (max {GAMES_MAX_RANGE_DAYS} days)."}), 400
 
+    key = ("games", first.isoformat(), last.isoformat())
+    cached = entry["views"].get(key)
+    if cached is None:
+        days = index.get("days", {})
+        cached = _encode_entry({
+            "from": key[1],
+            "to": key[2],
+            "window": window,
+            "last_updated": entry["last_updated"],
+            "days": {d: days[d] for d in sorted(days) if key[1] <= d <= key[2]},
+        })
+        if len(entry["views"]) < VIEWS_PER_ENTRY:
+            entry["views"][key] = cached
+    return _cached_json_response(cached)
+
+@app.route("/api/games")
+def api_games():
+    """
+    /api/games?from=YYYY-MM-DD&to=YYYY-MM-DD: juegos por día (hora Chile, día
+    deportivo o calendario según DAY_WINDOW_MODE) desde el índice que publica el
+    updater. Sin parámetros = hoy; from=yesterday = anoche.
+    """
+    return _games_response(_games_index)
+
+@app.route("/api/<league>/games")
+def api_league_games(league):
+    cache = _league_payload(league, GAMES_INDEX_FILE)
+    if cache is None:
+        return jsonify({"error": f"Unknown league '{league}'."}), 404
+    return _games_response(cache)
+
+def _timeline_view(cache, view, build):
+    """
+    Vista del timeline a `?as_of=` (fecha/hora Chile o epoch; sin él = ahora).
+    build(timeline, as_of) arma el contenido; se memoiza por as_of explícito.
+    """
     try:
-        with open(CACHE_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        # Opcional: añadir la marca de tiempo de la última actualización
-        data["last_updated"] = datetime.fromtimestamp(os.path.getmtime(CACHE_FILE)).strftime("%Y-%m-%d %H:%M:%S")
-        
-        return jsonify(data)
+        entry = cache.get()
+    except FileNotFoundError:
+        return _not_ready()
     except Exception as e:
         return jsonify({"error": f"Failed to read cached data: {e}"}), 500
 
+    raw = request.args.get("as_of")
+    try:
+        if not raw:
+            as_of = int(time.time())
+        elif raw.isdigit():
+            as_of = int(raw)
+        else:
+            as_of = timeline.parse_local_time(raw, end_of_day=True)
+    except ValueError:
+        return jsonify({"error": "Invalid 'as_of' (use YYYY-MM-DD, YYYY-MM-DDTHH:MM in Chile time, or epoch)."}), 400
+
+    key = (view, as_of)
+    cached = entry["views"].get(key) if raw else None  # sin as_of = "ahora": no se memoiza
+    if cached is None:
+        tl = entry.get("timeline")
+        if tl is None:
+            tl = entry["timeline"] = timeline.Timeline.from_dict(entry["data"])
+        cached = _encode_entry(dict({
+            "as_of": datetime.fromtimestamp(as_of, SCL).isoformat(),
+            "last_updated": entry["last_updated"],
+        }, **build(tl, as_of)))
+        if raw and len(entry["views"]) < VIEWS_PER_ENTRY:
+            entry["views"][key] = cached
+    return _cached_json_response(cached)
+
+def _standings_response(cache):
+    return _timeline_view(cache, "standings", lambda tl, as_of: {"standings": tl.rows_as_of(as_of)})
+
+def _h2h_response(cache):
+    return _timeline_view(cache, "h2h", lambda tl, as_of: tl.stats_as_of(as_of).matrix())
+
+@app.route("/api/standings")
+def api_standings():
+    """
+    /api/standings?as_of=<fecha>: tabla con los juegos y ajustes hasta ese momento
+    (hora Chile; sólo fecha = hasta el fin de ese día). Sale del timeline que publica
+    el updater (W/L por hora de juego): bisect por equipo, sin llamar a la API.
+    """
+    return _standings_response(_timeline)
+
+@app.route("/api/<league>/standings")
+def api_league_standings(league):
+    cache = _league_payload(league, TIMELINE_FILE)
+    if cache is None:
+        return jsonify({"error": f"Unknown league '{league}'."}), 404
+    return _standings_response(cache)
+
+@app.route("/api/h2h")
+def api_h2h():
+    """
+    /api/h2h[?as_of=<fecha>]: cara a cara equipo × equipo. "matrix"[i][j] = [W, L] del
+    equipo teams[i] contra teams[j] (null en la diagonal). Del mismo timeline que /api/standings.
+    """
+    return _h2h_response(_timeline)
+
+@app.route("/api/<league>/h2h")
+def api_league_h2h(league):
+    cache = _league_payload(league, TIMELINE_FILE)
+    if cache is None:
+        return jsonify({"error": f"Unknown league '{league}'."}), 404
+    return _h2h_response(cache)
+
+def _snapshot_delta(old, new):
+    """Filas cambiadas (por equipo), juegos nuevos/retirados y el orden nuevo."""
+    old_rows = {r.get("team"): r for r in old.get("standings", [])}
+    new_rows = {r.get("team"): r for r in new.get("standings", [])}
+    key = lambda g: json.dumps(g, sort_keys=True)  # juegos pueden venir como string u objeto
+    old_games = set(map(key, old.get("games_today", [])))
+    new_games = set(map(key, new.get("games_today", [])))
+    return {
+        "full": False,
+        "since": old.get("version"),
+        "version": new.get("version"),
+        "hash": new.get("hash"),
+        "last_updated": new.get("last_updated"),
+        "standings_changed": [r for t, r in new_rows.items() if old_rows.get(t) != r],
+        "standings_removed": [t for t in old_rows if t not in new_rows],
+        "order": [r.get("team") for r in new.get("standings", [])],
+        "games_added": [g for g in new.get("games_today", []) if key(g) not in old_games],
+        "games_removed": [g for g in old.get("games_today", []) if key(g) not in new_games],
+    }
+
+@app.route("/api/delta")
+def api_delta():
+    """
+    /api/delta?since=<version>: sólo lo que cambió desde esa versión.
+    Si la versión ya no está en snapshots/ (cliente muy atrasado) responde el
+    snapshot completo con "full": true.
+    """
+    try:
+        entry = _payload.get()
+    except FileNotFoundError:
+        return _not_ready()
+    except Exception as e:
+        return jsonify({"error": f"Failed to read cached data: {e}"}), 500
+
+    since = request.args.get("since", type=int)
+    if since is None:
+        return jsonify({"error": "Missing or invalid 'since' parameter."}), 400
+
+    cached = entry["deltas"].get(since)
+    if cached is None:
+        old = snapshots.load_version(CACHE_FILE, since) if since != entry["version"] else entry["data"]
+        if old is None:
+            cached = _encode_entry(dict(entry["data"], full=True))
+        else:
+            cached = _encode_entry(_snapshot_delta(old, entry["data"]))
+        if len(entry["deltas"]) < snapshots.SNAPSHOT_KEEP + 2:
+            entry["deltas"][since] = cached
+    return _cached_json_response(cached)
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """
+    Métricas del updater (etapas, API upstream, ingesta) + edad del snapshot servido.
+    Siempre desde REFRESH_METRICS_FILE, también con el refresher embebido: así todos
+    los workers responden lo mismo y no se suma el REGISTRY del proceso que refresca.
+    """
+    out = []
+    refresh = metrics.load(REFRESH_METRICS_FILE)
+    if refresh is not None:
+        out.append(refresh.render())
+
+    live = metrics.Registry()
+    live.gauge("strike_snapshot_age_seconds", "Segundos desde que se escribió el snapshot vigente")
+    live.gauge("strike_snapshot_version", "Versión del snapshot vigente")
+    try:
+        entry = _payload.get()
+        live.set("strike_snapshot_age_seconds", max(0.0, time.time() - entry["mtime"]))
+        live.set("strike_snapshot_version", entry["version"] or 0)
+    except Exception:
+        pass
+    out.append(live.render())
+    return Response("".join(out), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _sse(event, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route("/api/stream")
+def api_stream():
+    """
+    Avisa (evento "snapshot" con version/hash) sólo cuando el updater publica un
+    snapshot nuevo; entre medio manda un comentario de heartbeat cada 15 s.
+    """
+    if not _stream_slots.acquire(blocking=False):
+        resp = jsonify({"error": "Too many stream clients, use polling."})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "60"
+        return resp
+
+    last_seen = request.headers.get("Last-Event-ID")
+
+    def gen():
+        sent_version = last_seen
+        started = last_beat = time.monotonic()
+        yield "retry: 5000\n\n"
+        while time.monotonic() - started < STREAM_MAX_SECONDS:
+            try:
+                entry = _payload.get()
+            except Exception:
+                entry = None
+            now = time.monotonic()
+            if entry and str(entry["version"]) != sent_version:
+                sent_version = str(entry["version"])
+                last_beat = now
+                yield _sse("snapshot", {
+                    "version": entry["version"],
+                    "hash": entry["hash"],
+                    "last_updated": entry["last_updated"],
+                }, event_id=entry["version"])
+            elif now - last_beat >= STREAM_HEARTBEAT_SECONDS:
+                last_beat = now
+                yield ": ping\n\n"
+            time.sleep(STREAM_POLL_SECONDS)
+
+    released = []
+
+    def release():
+        if not released:
+            released.append(True)
+            _stream_slots.release()
+
+    resp = Response(gen(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    resp.call_on_close(release)
+    return resp
+
 
 
 
@@ -0,0 +1,231 @@
+# bench/fake_api.py
+# Servidor local que imita https://mlb25.theshow.com/apis/game_history.json
+# para medir sin tocar la API real.
+# - Historiales sintéticos (liga de N usuarios) o grabados (bitácora out/capture.ndjson.gz,
+#   o una carpeta con los <usuario>_raw.json de antes).
+# - Latencia, tasa de error y tamaño de página configurables.
+# - ETag / If-None-Match (304) como haría un CDN.
+#
+# Uso suelto:
+#   python bench/fake_api.py --port 8765 --users 14 --latency 0.15 --error-rate 0.02
+#   (y en standings_cascade_points_desc.py: API = "http://127.0.0.1:8765/apis/game_history.json")
+
+import argparse, glob, hashlib, json, os, random, sys, threading, time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from capture_log import read_histories
+
+DATE_FMT = "%m/%d/%Y %H:%M:%S"
+OTHER_MODES = ("EXHIBITION", "RANKED", "BATTLE_ROYALE")
+
+
+def synthetic_league(n_users, teams=None):
+    """[(username, equipo)] para una liga sintética de n_users (usa `teams` si alcanza)."""
+    teams = list(teams or [])
+    out = []
+    for i in range(n_users):
+        team = teams[i] if i < len(teams) else f"Team {i + 1:03d}"
+        out.append((f"bench_user_{i + 1:03d}", team))
+    return out
+
+
+def synthetic_histories(league, since, games_per_user=13, cpu_ratio=0.15,
+                        other_ratio=0.5, today_games=6, seed=1, now=None):
+    """
+    Historiales {username: [juegos más nuevo → más viejo]} con el formato de la API.
+    Cada juego entre miembros aparece en el historial de AMBOS (como en la API real).
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+    users = [u for u, _t in league]
+    team = dict(league)
+    hist = {u: [] for u in users}
+    span = max((now - since).total_seconds(), 3600)
+    next_id = [10_000_000]
+
+    def game(home_user, away_user, home_team, away_team, when, mode="LEAGUE"):
+        next_id[0] += 1
+        hr, ar = rng.randint(0, 9), rng.randint(0, 9)
+        if hr == ar:
+            hr += 1
+        return {
+            "id": str(next_id[0]),
+            "game_mode": mode,
+            "display_date": when.strftime(DATE_FMT),
+            "home_full_name": home_team,
+            "away_full_name": away_team,
+            "home_name": home_user,
+            "away_name": away_user,
+            "home_display_result": "W" if hr > ar else "L",
+            "away_display_result": "L" if hr > ar else "W",
+            "home_runs": str(hr),
+            "away_runs": str(ar),
+            "display_pitcher_info": f"P{rng.randint(1, 99)}",
+        }
+
+    total_league = len(users) * games_per_user // 2
+    for k in range(total_league):
+        a, b = rng.sample(users, 2)
+        if k < today_games:
+            when = now - timedelta(minutes=rng.randint(5, 300))
+        else:
+            when = since + timedelta(seconds=rng.uniform(0, span))
+        g = game(a, b, team[a], team[b], when)
+        hist[a].append(g)
+        hist[b].append(g)
+
+    for u in users:
+        extra_cpu = int(games_per_user * cpu_ratio)
+        for _ in range(extra_cpu):
+            when = since + timedelta(seconds=rng.uniform(0, span))
+            hist[u].append(game(u, "CPU", team[u], "Yankees", when))
+        # Ruido: otros modos y juegos anteriores a SINCE
+        for _ in range(int(games_per_user * other_ratio)):
+            when = since + timedelta(seconds=rng.uniform(-span, span))
+            hist[u].append(game(u, "rival_random", team[u], "Dodgers", when, rng.choice(OTHER_MODES)))
+        for _ in range(5):
+            when = since - timedelta(days=rng.uniform(1, 60))
+            hist[u].append(game(u, "CPU", team[u], "Cubs", when))
+
+    for u in users:
+        hist[u].sort(key=lambda g: datetime.strptime(g["display_date"], DATE_FMT), reverse=True)
+    return hist
+
+
+def recorded_histories(folder):
+    """Historiales grabados: bitácora de capturas (archivo) o carpeta con <usuario>_raw.json."""
+    if os.path.isfile(folder):
+        hist = read_histories(folder)
+        for games in hist.values():  # la bitácora va en orden de captura; la API, del más nuevo al más viejo
+            games.sort(key=lambda g: datetime.strptime(g["display_date"], DATE_FMT), reverse=True)
+        return hist
+    hist = {}
+    for path in glob.glob(os.path.join(folder, "*_raw.json")):
+        user = os.path.basename(path)[: -len("_raw.json")]
+        with open(path, "r", encoding="utf-8") as f:
+            hist[user] = json.load(f)
+    return hist
+
+
+class FakeGameHistoryAPI:
+    """Servidor HTTP en un hilo aparte. `url` apunta al endpoint de game_history."""
+
+    def __init__(self, histories, per_page=25, latency=0.0, jitter=0.0,
+                 error_rate=0.0, host="127.0.0.1", port=0, seed=1):
+        self.histories = {u.lower(): h for u, h in histories.items()}
+        self.per_page = per_page
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                api._handle(self)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.server.request_queue_size = 128
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/apis/game_history.json"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.errors = self.not_modified = 0
+
+    def _handle(self, h):
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.error_rate
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.errors += 1
+            self._send(h, 503, b'{"error":"fake upstream error"}')
+            return
+
+        q = parse_qs(urlparse(h.path).query)
+        user = (q.get("username") or [""])[0].lower()
+        try:
+            page = max(1, int((q.get("page") or ["1"])[0]))
+        except ValueError:
+            page = 1
+        items = self.histories.get(user, [])[(page - 1) * self.per_page: page * self.per_page]
+        body = json.dumps({"game_history": items}, separators=(",", ":")).encode("utf-8")
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if h.headers.get("If-None-Match") == etag:
+            with self._lock:
+                self.not_modified += 1
+            self._send(h, 304, b"", etag)
+            return
+        self._send(h, 200, body, etag)
+
+    @staticmethod
+    def _send(h, status, body, etag=None):
+        h.send_response(status)
+        if etag:
+            h.send_header("ETag", etag)
+        h.send_header("Content-Type", "application/json")
+        h.send_header("Content-Length", str(len(body)))
+        h.end_headers()
+        if body:
+            h.wfile.write(body)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stand-in local de game_history.json")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--users", type=int, default=14)
+    ap.add_argument("--games-per-user", type=int, default=13)
+    ap.add_argument("--per-page", type=int, default=25)
+    ap.add_argument("--latency", type=float, default=0.15)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--since", default="2025-08-23")
+    ap.add_argument("--recorded", help="bitácora out/capture.ndjson.gz (o carpeta con <usuario>_raw.json)")
+    args = ap.parse_args()
+
+    if args.recorded:
+        hist = recorded_histories(args.recorded)
+    else:
+        league = synthetic_league(args.users)
+        hist = synthetic_histories(league, datetime.fromisoformat(args.since), args.games_per_user)
+    api = FakeGameHistoryAPI(hist, per_page=args.per_page, latency=args.latency,
+                             jitter=args.jitter, error_rate=args.error_rate, port=args.port)
+    print(f"Sirviendo {len(hist)} historiales en {api.url} (Ctrl+C para salir)")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
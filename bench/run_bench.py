@@ -0,0 +1,157 @@
+# bench/run_bench.py
+# Benchmark offline del refresh contra el stand-in local de game_history (bench/fake_api.py).
+# Mide compute_rows(), games_played_today_scl() y update_data_cache() de punta a punta:
+# requests a la "API", tiempo de pared y memoria pico (tracemalloc).
+#
+# Ejemplos:
+#   python bench/run_bench.py                         # liga real (14) + 100 + 300 usuarios sintéticos
+#   python bench/run_bench.py --sizes real,500 --latency 0.2 --error-rate 0.05
+#   python bench/run_bench.py --recorded out/capture.ndjson.gz   # replay de la bitácora de capturas
+
+import argparse, contextlib, io, os, shutil, sys, tempfile, time, tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standings_cascade_points_desc as standings
+import update_cache
+from http_transport import Transport
+from fake_api import FakeGameHistoryAPI, synthetic_league, synthetic_histories, recorded_histories
+
+REAL_LEAGUE = list(standings.LEAGUE_ORDER)
+REAL_ALIASES = dict(standings.FETCH_ALIASES)
+REAL_USERS = set(standings.LEAGUE_USERS)
+
+
+def configure(league, aliases, extra_users, api_url, workdir):
+    """Apunta el módulo de standings a la liga/API del benchmark, con store y cache aislados."""
+    S = standings
+    S.LEAGUE_ORDER = list(league)
+    S.FETCH_ALIASES = dict(aliases)
+    S.LEAGUE_USERS = {u for (u, _t) in league} | set(extra_users)
+    for base, alts in aliases.items():
+        S.LEAGUE_USERS.add(base)
+        S.LEAGUE_USERS.update(alts)
+    S.LEAGUE_USERS_NORM = {u.lower() for u in S.LEAGUE_USERS}
+    S.API = api_url
+    S.DUMP_ENABLED = False
+    S.PRINT_CAPTURE_SUMMARY = False
+    S.PRINT_CAPTURE_LIST = False
+    S.PAGE1_CACHE_TTL = 0  # cada refresh revalida p1 (lo normal entre refrescos de 5 min)
+    S.GAME_STORE_FILE = os.path.join(workdir, "games.sqlite3")
+    S.HTTP_CACHE_DIR = os.path.join(workdir, "http_cache")
+    S.TRANSPORT = Transport(cache_dir=S.HTTP_CACHE_DIR, pool_size=S.MAX_IN_FLIGHT,
+                            timeout=S.TIMEOUT, retries=S.RETRIES,
+                            circuit_threshold=S.CIRCUIT_FAILURE_THRESHOLD,
+                            circuit_cooldown=S.CIRCUIT_COOLDOWN_SECONDS)
+    # Todo lo que publica update_data_cache() va al workdir (nunca a la raíz del repo)
+    update_cache.CACHE_FILE = os.path.join(workdir, "standings_cache.json")
+    update_cache.REFRESH_METRICS_FILE = os.path.join(workdir, "refresh_metrics.json")
+    update_cache.GAMES_INDEX_FILE = os.path.join(workdir, "games_index.json")
+    update_cache.TIMELINE_FILE = os.path.join(workdir, "standings_timeline.json")
+    update_cache.STATIC_PAGE_FILE = os.path.join(workdir, "standings.html")
+
+
+def measure(name, api, fn, track_memory=True):
+    api.reset_counters()
+    if track_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    wall = time.perf_counter() - t0
+    peak = 0
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "scenario": name,
+        "requests": api.requests,
+        "not_modified": api.not_modified,
+        "errors": api.errors,
+        "wall_s": wall,
+        "peak_mb": peak / 1e6,
+    }
+
+
+def run_size(label, league, aliases, extra_users, histories, args):
+    api = FakeGameHistoryAPI(histories, per_page=args.per_page, latency=args.latency,
+                             jitter=args.jitter, error_rate=args.error_rate).start()
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    results = []
+    try:
+        configure(league, aliases, extra_users, api.url, workdir)
+        mem = not args.no_memory
+
+        standings.USE_GAME_STORE = False
+        results.append(measure("compute_rows (descarga completa)", api, standings.compute_rows, mem))
+        results.append(measure("games_played_today_scl (descarga completa)", api,
+                               standings.games_played_today_scl, mem))
+
+        standings.USE_GAME_STORE = True
+        shutil.rmtree(standings.HTTP_CACHE_DIR, ignore_errors=True)  # refresh en frío de verdad
+        results.append(measure("update_data_cache (store vacío)", api, update_cache.update_data_cache, mem))
+        results.append(measure("update_data_cache (régimen normal)", api, update_cache.update_data_cache, mem))
+    finally:
+        api.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    for r in results:
+        r["league"] = label
+        r["users"] = len(league)
+    return results
+
+
+def format_table(results):
+    head = f"{'Liga':<10} {'Usuarios':>8}  {'Escenario':<44} {'Req':>6} {'304':>5} {'Err':>4} {'Tiempo(s)':>10} {'Mem pico(MB)':>13}"
+    lines = [head, "-" * len(head)]
+    for r in results:
+        lines.append(
+            f"{r['league']:<10} {r['users']:>8}  {r['scenario']:<44} {r['requests']:>6} {r['not_modified']:>5} "
+            f"{r['errors']:>4} {r['wall_s']:>10.2f} {r['peak_mb']:>13.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark offline del refresh de standings")
+    ap.add_argument("--sizes", default="real,100,300",
+                    help="'real' = LEAGUE_ORDER actual; números = ligas sintéticas de N usuarios")
+    ap.add_argument("--games-per-user", type=int, default=13)
+    ap.add_argument("--per-page", type=int, default=25)
+    ap.add_argument("--latency", type=float, default=0.15)
+    ap.add_argument("--jitter", type=float, default=0.05)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--recorded", help="bitácora de capturas o carpeta con <usuario>_raw.json (liga real)")
+    ap.add_argument("--no-memory", action="store_true", help="no medir memoria (tracemalloc agrega overhead)")
+    ap.add_argument("--out", help="además escribe la tabla en este archivo")
+    args = ap.parse_args()
+
+    since = standings.SINCE
+    now = datetime.utcnow()
+    results = []
+    for size in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+        if size == "real":
+            league, aliases, extra = REAL_LEAGUE, REAL_ALIASES, REAL_USERS
+            if args.recorded:
+                hist = recorded_histories(args.recorded)
+            else:
+                hist = synthetic_histories(league, since, args.games_per_user, now=now)
+        else:
+            league = synthetic_league(int(size), [t for _u, t in REAL_LEAGUE])
+            aliases, extra = {}, set()
+            hist = synthetic_histories(league, since, args.games_per_user, now=now)
+        print(f"== Liga {size}: {len(league)} usuarios ...", flush=True)
+        results += run_size(size, league, aliases, extra, hist, args)
+
+    table = format_table(results)
+    print()
+    print(table)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(table + "\n")
+
+
+if __name__ == "__main__":
+    main()
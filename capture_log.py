@@ -0,0 +1,99 @@
+# capture_log.py
+# Bitácora de capturas: NDJSON comprimido (gzip), sólo se agrega al final.
+# - Una línea por página bajada de la API, con metadatos (cuenta, página, hora, ms, n, sha1).
+#   Los juegos ("items", tal cual los entrega la API) se guardan sólo la PRIMERA vez que
+#   aparece ese contenido: una p1 sin cambios (cache/304) vuelve a costar una línea corta.
+# - Cada refresh se escribe como un miembro gzip aparte (el lector los lee seguidos) y cierra
+#   con una línea "refresh" (requests, juegos nuevos). Si el proceso muere a mitad de una
+#   escritura, el lector ignora la cola truncada.
+# - read_histories() rearma los historiales por cuenta sin red (replay.py, bench/).
+
+import gzip, hashlib, json, os, threading, time, zlib
+
+
+def _page_sha(items) -> str:
+    blob = json.dumps(items, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()
+
+
+def iter_records(path):
+    """Registros de la bitácora en orden; tolera un último miembro gzip truncado."""
+    if not path or not os.path.exists(path):
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        except (EOFError, OSError, zlib.error):
+            return
+
+
+def read_histories(path):
+    """
+    {username: [juego (dict de la API), ...]} con cada juego una sola vez por cuenta,
+    del más nuevo al más viejo según se fue registrando.
+    """
+    hist = {}
+    seen = {}
+    for rec in iter_records(path):
+        items = rec.get("items")
+        if not items:
+            continue
+        user = rec.get("user", "")
+        keys = seen.setdefault(user, set())
+        out = hist.setdefault(user, [])
+        for g in items:
+            key = g.get("id") or json.dumps(g, sort_keys=True, ensure_ascii=False)
+            if key in keys:
+                continue
+            keys.add(key)
+            out.append(g)
+    return hist
+
+
+class CaptureLog:
+    """Escritor de la bitácora (seguro entre hilos: las páginas llegan desde el pool de descargas)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = []
+        self._seen = None  # sha1 de páginas ya guardadas (se carga de la bitácora la primera vez)
+
+    def _load_seen(self):
+        self._seen = {rec["sha"] for rec in iter_records(self.path) if rec.get("items") and rec.get("sha")}
+
+    def record_page(self, username, platform, page, items, elapsed=None):
+        sha = _page_sha(items)
+        rec = {"at": round(time.time(), 3), "user": username, "platform": platform, "page": page,
+               "n": len(items), "sha": sha}
+        if elapsed is not None:
+            rec["ms"] = round(elapsed * 1000, 1)
+        with self._lock:
+            if self._seen is None:
+                self._load_seen()
+            if sha not in self._seen:
+                self._seen.add(sha)
+                rec["items"] = items
+            self._pending.append(rec)
+
+    def record_error(self, username, platform, page, error):
+        with self._lock:
+            self._pending.append({"at": round(time.time(), 3), "user": username, "platform": platform,
+                                  "page": page, "error": str(error)})
+
+    def flush(self, **meta):
+        """Escribe lo pendiente como un miembro gzip nuevo (+ línea "refresh" con `meta`)."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            records, self._pending = self._pending, []
+        records.append({"at": round(time.time(), 3), "refresh": meta})
+        data = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "ab") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            gz.write(data.encode("utf-8"))
+        return len(records)
@@ -0,0 +1,181 @@
+# game_record.py
+# Registro compacto de un juego (Game, con __slots__), parseado UNA vez al ingresar.
+# - Guarda sólo lo que usan los reportes: clave/id, modo, epoch UTC, usuarios normalizados,
+#   equipos (nombre + clave normalizada), resultado, carreras y pitcher_info.
+# - Los strings repetidos (modo, usuarios, equipos, W/L) se internan: miles de juegos
+#   comparten los mismos objetos.
+# - Día calendario y día deportivo (06:00–05:59) en hora Chile, calculados al parsear:
+#   los reportes por día agrupan por esas claves sin convertir zonas horarias.
+# - to_api() vuelve al formato de la API (dumps, replays del benchmark).
+
+import hashlib, json, re, sys
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+BXX_RE = re.compile(r"\^(b\d+)\^", flags=re.IGNORECASE)
+API_DATE_FMT = "%m/%d/%Y %H:%M:%S"
+SCL = ZoneInfo("America/Santiago")
+SPORTS_DAY_START_HOUR = 6  # día deportivo Chile: 06:00–05:59
+
+
+def game_key(g) -> str:
+    """Id del juego; si la API no lo trae, un hash estable del contenido."""
+    gid = str(g.get("id") or "")
+    if gid:
+        return gid
+    blob = json.dumps(g, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return "h:" + hashlib.sha1(blob).hexdigest()
+
+
+def normalize_user_for_compare(raw: str) -> str:
+    if not raw: return ""
+    return BXX_RE.sub("", raw).strip().lower()
+
+
+def parse_date(s: str):
+    # Camino rápido para el formato de la API ('MM/DD/YYYY HH:MM:SS'): strptime es lo más
+    # caro de parsear un juego (replay de la temporada completa, ingesta de historiales).
+    if len(s) == 19 and s[2] == "/" and s[5] == "/" and s[13] == ":" and s[16] == ":":
+        try:
+            return datetime(int(s[6:10]), int(s[0:2]), int(s[3:5]), int(s[11:13]), int(s[14:16]), int(s[17:19]))
+        except ValueError:
+            pass
+    for fmt in (API_DATE_FMT, "%m/%d/%Y %H:%M"):
+        try:
+            return datetime.strptime(s, fmt)
+        except:
+            pass
+    return None
+
+
+def epoch_utc(d: datetime) -> int:
+    """datetime naive (UTC, como display_date) → epoch."""
+    return int(d.replace(tzinfo=timezone.utc).timestamp())
+
+
+def current_day(window, now=None) -> str:
+    """Día en curso en Chile, 'YYYY-MM-DD': deportivo (06:00–05:59) si window == "sports", si no calendario."""
+    now = now or datetime.now(SCL)
+    if window == "sports":
+        now -= timedelta(hours=SPORTS_DAY_START_HOUR)
+    return now.date().isoformat()
+
+
+_DAY_CACHE = {}
+
+
+def local_days(ts):
+    """
+    (día calendario, día deportivo) en Chile como 'YYYY-MM-DD' para un epoch.
+    Memo por media hora (los cambios de día y de horario en Chile caen en horas
+    enteras): miles de juegos cuestan unas pocas conversiones de zona horaria.
+    """
+    if ts is None:
+        return "", ""
+    bucket = ts // 1800
+    days = _DAY_CACHE.get(bucket)
+    if days is None:
+        d = datetime.fromtimestamp(bucket * 1800, SCL)
+        sports = (d - timedelta(hours=SPORTS_DAY_START_HOUR)).date()
+        days = _DAY_CACHE[bucket] = (sys.intern(d.date().isoformat()), sys.intern(sports.isoformat()))
+    return days
+
+
+def _s(value) -> str:
+    return sys.intern((value or "").strip())
+
+
+class Game:
+    __slots__ = (
+        "key", "mode", "ts",
+        "home_user", "away_user",          # normalizados (sin ^bNN^, minúsculas)
+        "home_team", "away_team",          # nombre para mostrar
+        "home_team_key", "away_team_key",  # norm_team() del nombre
+        "home_result", "away_result",      # "W" / "L" / ""
+        "home_runs", "away_runs",          # tal como vienen ("0" si faltan)
+        "pitcher",
+        "day_calendar", "day_sports",      # 'YYYY-MM-DD' en Chile (ver local_days)
+    )
+
+    def __init__(self, key, mode, ts, home_user, away_user, home_team, away_team,
+                 home_team_key, away_team_key, home_result, away_result,
+                 home_runs, away_runs, pitcher, day_calendar="", day_sports=""):
+        self.key = key
+        self.mode = mode
+        self.ts = ts
+        self.home_user = home_user
+        self.away_user = away_user
+        self.home_team = home_team
+        self.away_team = away_team
+        self.home_team_key = home_team_key
+        self.away_team_key = away_team_key
+        self.home_result = home_result
+        self.away_result = away_result
+        self.home_runs = home_runs
+        self.away_runs = away_runs
+        self.pitcher = pitcher
+        self.day_calendar = day_calendar
+        self.day_sports = day_sports
+
+    @classmethod
+    def from_api(cls, g: dict, key=None):
+        d = parse_date(g.get("display_date", ""))
+        ts = epoch_utc(d) if d else None
+        home_team, away_team = _s(g.get("home_full_name")), _s(g.get("away_full_name"))
+        return cls(
+            key or game_key(g),
+            sys.intern((g.get("game_mode") or "").strip().upper()),
+            ts,
+            sys.intern(normalize_user_for_compare(g.get("home_name", ""))),
+            sys.intern(normalize_user_for_compare(g.get("away_name", ""))),
+            home_team, away_team,
+            sys.intern(home_team.lower()), sys.intern(away_team.lower()),
+            sys.intern((g.get("home_display_result") or "").strip().upper()),
+            sys.intern((g.get("away_display_result") or "").strip().upper()),
+            str(g.get("home_runs") or "0"), str(g.get("away_runs") or "0"),
+            (g.get("display_pitcher_info") or "").strip(),
+            *local_days(ts),
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        """Fila de game_store (mismas columnas y orden que __slots__)."""
+        key, mode, ts, hu, au, ht, at, hk, ak, hr, ar, hruns, aruns, pitcher, dc, ds = row
+        return cls(key, sys.intern(mode), ts, sys.intern(hu), sys.intern(au),
+                   sys.intern(ht), sys.intern(at), sys.intern(hk), sys.intern(ak),
+                   sys.intern(hr), sys.intern(ar), hruns, aruns, pitcher,
+                   sys.intern(dc or ""), sys.intern(ds or ""))
+
+    def as_row(self):
+        return tuple(getattr(self, f) for f in self.__slots__)
+
+    @property
+    def id(self) -> str:
+        return "" if self.key.startswith("h:") else self.key
+
+    @property
+    def display_date(self) -> str:
+        if self.ts is None:
+            return ""
+        return datetime.fromtimestamp(self.ts, timezone.utc).strftime(API_DATE_FMT)
+
+    def to_api(self) -> dict:
+        """Dict con el formato de game_history (nombres de usuario ya normalizados)."""
+        return {
+            "id": self.id,
+            "game_mode": self.mode,
+            "display_date": self.display_date,
+            "home_full_name": self.home_team,
+            "away_full_name": self.away_team,
+            "home_name": self.home_user,
+            "away_name": self.away_user,
+            "home_display_result": self.home_result,
+            "away_display_result": self.away_result,
+            "home_runs": self.home_runs,
+            "away_runs": self.away_runs,
+            "display_pitcher_info": self.pitcher,
+        }
+
+    def __repr__(self):
+        return (f"Game({self.key!r}, {self.mode}, {self.display_date}, "
+                f"{self.away_team} @ {self.home_team} {self.away_runs}-{self.home_runs})")
@@ -0,0 +1,157 @@
+# game_store.py
+# Almacén local (SQLite) de los juegos descargados de game_history.
+# - Clave = id del juego (la misma que usa dedup_by_id); juegos sin id usan un hash del contenido.
+# - game_users guarda en qué historial (cuenta) apareció cada juego, para que cada
+#   participante siga viendo sólo "sus" páginas como antes.
+# - user_state marca si el historial de una cuenta ya se leyó completo y hasta qué fecha
+#   (complete_since); sólo si llega al SINCE pedido es seguro cortar la paginación al
+#   encontrar un id conocido (una liga nueva con SINCE más antiguo obliga a releer).
+# - Cada juego se parsea UNA vez al ingresar (game_record.Game) y se guarda también en
+#   columnas: la lectura arma los Game directo desde la fila, sin volver a tocar el JSON.
+
+import sqlite3, json, os
+from datetime import datetime
+
+from game_record import Game
+
+# Columnas de Game (mismo orden que Game.__slots__; "id" = Game.key)
+GAME_COLUMNS = ("id", "mode", "ts", "home_user", "away_user", "home_team", "away_team",
+                "home_team_key", "away_team_key", "home_result", "away_result",
+                "home_runs", "away_runs", "pitcher", "day_calendar", "day_sports")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id           TEXT PRIMARY KEY,
+    ts           INTEGER,            -- display_date en epoch (UTC), para ordenar
+    raw          TEXT NOT NULL,      -- juego tal como lo entrega la API (JSON)
+    mode TEXT, home_user TEXT, away_user TEXT, home_team TEXT, away_team TEXT,
+    home_team_key TEXT, away_team_key TEXT, home_result TEXT, away_result TEXT,
+    home_runs TEXT, away_runs TEXT, pitcher TEXT,
+    day_calendar TEXT, day_sports TEXT     -- día en Chile (calendario / deportivo 06:00–05:59)
+);
+CREATE TABLE IF NOT EXISTS game_users (
+    username     TEXT NOT NULL,
+    id           TEXT NOT NULL,
+    PRIMARY KEY (username, id)
+);
+CREATE TABLE IF NOT EXISTS user_state (
+    username     TEXT PRIMARY KEY,
+    complete     INTEGER NOT NULL DEFAULT 0,
+    updated_at   TEXT,
+    complete_since INTEGER           -- epoch (UTC) hasta donde se leyó completo; NULL = no se sabe
+);
+CREATE INDEX IF NOT EXISTS idx_games_ts ON games (ts);
+"""
+
+
+class GameStore:
+    """Acceso al SQLite. Usar desde un solo hilo (el que lo abrió)."""
+
+    _SELECT = ", ".join("g." + c for c in GAME_COLUMNS)
+    _UPDATE_SQL = ("UPDATE games SET " + ", ".join(c + " = ?" for c in GAME_COLUMNS[1:]) + " WHERE id = ?")
+    _INSERT_SQL = ("INSERT OR IGNORE INTO games (raw, " + ", ".join(GAME_COLUMNS) + ") VALUES ("
+                   + ", ".join("?" * (len(GAME_COLUMNS) + 1)) + ")")
+
+    def __init__(self, path: str):
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Stores de versiones anteriores: agrega las columnas que falten y las llena desde raw (una sola vez)."""
+        state_cols = {r[1] for r in self.db.execute("PRAGMA table_info(user_state)")}
+        if "complete_since" not in state_cols:
+            # Sin la fecha no se sabe hasta dónde se leyó: cada cuenta se relee completa una vez
+            with self.db:
+                self.db.execute("ALTER TABLE user_state ADD COLUMN complete_since INTEGER")
+        cols = {r[1] for r in self.db.execute("PRAGMA table_info(games)")}
+        missing = [c for c in GAME_COLUMNS if c not in cols]
+        if not missing:
+            return
+        with self.db:
+            for c in missing:
+                self.db.execute(f"ALTER TABLE games ADD COLUMN {c} {'INTEGER' if c == 'ts' else 'TEXT'}")
+            rows = self.db.execute("SELECT id, raw FROM games").fetchall()
+            for key, raw in rows:
+                self.db.execute(self._UPDATE_SQL, Game.from_api(json.loads(raw), key).as_row()[1:] + (key,))
+        print(f"[store] {len(rows)} juegos migrados al formato compacto")
+
+    def close(self):
+        self.db.close()
+
+    # --- lectura ---
+    def known_ids(self, username: str) -> set:
+        cur = self.db.execute("SELECT id FROM game_users WHERE username = ?", (username,))
+        return {r[0] for r in cur}
+
+    def is_complete(self, username: str, since_ts=None) -> bool:
+        """True si el historial de la cuenta ya se leyó completo (hasta `since_ts` o antes, si se indica)."""
+        row = self.db.execute(
+            "SELECT complete, complete_since FROM user_state WHERE username = ?", (username,)
+        ).fetchone()
+        if not (row and row[0]):
+            return False
+        return since_ts is None or (row[1] is not None and row[1] <= since_ts)
+
+    def games_for_user(self, username: str, since_ts=None):
+        """Juegos (Game) del historial de una cuenta, del más nuevo al más viejo."""
+        sql = (f"SELECT {self._SELECT} FROM games g JOIN game_users u ON u.id = g.id "
+               "WHERE u.username = ?")
+        args = [username]
+        if since_ts is not None:
+            sql += " AND g.ts >= ?"
+            args.append(since_ts)
+        sql += " ORDER BY g.ts DESC, g.id DESC"
+        return [Game.from_row(r) for r in self.db.execute(sql, args)]
+
+    def last_game_ts(self, username: str, mode=None):
+        """Epoch del juego más reciente de la cuenta (opcionalmente de un game_mode); None si no hay."""
+        sql = ("SELECT MAX(g.ts) FROM games g JOIN game_users u ON u.id = g.id "
+               "WHERE u.username = ?")
+        args = [username]
+        if mode:
+            sql += " AND g.mode = ?"
+            args.append(mode.upper())
+        return self.db.execute(sql, args).fetchone()[0]
+
+    def count_games(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    # --- escritura ---
+    def add_games(self, username: str, games, complete=None, since_ts=None) -> int:
+        """
+        Ingresa juegos (dicts de la API) vistos en el historial de `username`;
+        cada uno se parsea a Game acá, una sola vez. Devuelve cuántos eran nuevos
+        para esa cuenta. Si `complete` no es None, actualiza user_state: completo
+        hasta `since_ts` (o hasta lo que ya estaba completo, si era más antiguo).
+        """
+        new = 0
+        with self.db:
+            for g in games:
+                rec = Game.from_api(g)
+                key = rec.key
+                self.db.execute(
+                    self._INSERT_SQL,
+                    (json.dumps(g, ensure_ascii=False, separators=(",", ":")),) + rec.as_row(),
+                )
+                cur = self.db.execute(
+                    "INSERT OR IGNORE INTO game_users (username, id) VALUES (?, ?)",
+                    (username, key),
+                )
+                new += cur.rowcount
+            if complete is not None:
+                self.db.execute(
+                    "INSERT INTO user_state (username, complete, updated_at, complete_since) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(username) DO UPDATE SET complete = excluded.complete, "
+                    "updated_at = excluded.updated_at, "
+                    "complete_since = CASE WHEN excluded.complete AND user_state.complete "
+                    "THEN MIN(COALESCE(user_state.complete_since, excluded.complete_since), "
+                    "excluded.complete_since) ELSE excluded.complete_since END",
+                    (username, int(bool(complete)), datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                     since_ts if complete else None),
+                )
+        return new
@@ -0,0 +1,268 @@
+# http_transport.py
+# Capa de transporte para las llamadas a la API de theshow.com.
+# - Una sola requests.Session con pool de conexiones (keep-alive, sin handshake TLS por página).
+# - Cache en disco por clave (username, platform, página) con TTL.
+# - Requests condicionales (If-None-Match / If-Modified-Since) si la API entrega ETag/Last-Modified:
+#   una página sin cambios cuesta un 304, o nada si el cache aún está fresco.
+# - Reintentos con backoff exponencial con jitter ("full jitter").
+# - Limitador adaptativo AIMD (concurrencia + ritmo) que retrocede ante 429/5xx/timeouts,
+#   y circuit breaker: si la API está claramente caída se corta de inmediato
+#   (p1 cae a lo último conocido en cache; el store conserva lo ya ingresado).
+
+import requests, time, random, json, os, hashlib, threading, tempfile
+from requests.adapters import HTTPAdapter
+
+from metrics import REGISTRY
+
+REGISTRY.gauge("strike_upstream_concurrency_limit", "Límite actual de requests simultáneos (AIMD)")
+REGISTRY.gauge("strike_upstream_min_interval_seconds", "Separación mínima actual entre requests (AIMD)")
+REGISTRY.gauge("strike_upstream_circuit_open", "1 si el circuit breaker está abierto")
+REGISTRY.counter("strike_upstream_short_circuits_total", "Llamadas cortadas por el circuit breaker")
+REGISTRY.counter("strike_upstream_stale_served_total", "Páginas servidas desde cache vencido por falla de la API")
+
+
+class CircuitOpenError(Exception):
+    """La API se considera caída: no se intenta la request."""
+
+
+class AdaptiveLimiter:
+    """
+    AIMD sobre la concurrencia y el ritmo de requests:
+      - éxito     → límite += 1/límite (≈ +1 por "ventana"), el intervalo mínimo se relaja;
+      - sobrecarga (429, 5xx, timeout, conexión) → límite /= 2 y el intervalo mínimo se duplica.
+    Retry-After de un 429 se respeta retrasando la próxima salida.
+    """
+
+    def __init__(self, max_limit=8, min_limit=1, base_interval=0.05, max_interval=5.0):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.min_interval = 0.0
+        self.in_flight = 0
+        self._next_start = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, overloaded=False, retry_after=None):
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded:
+                self.limit = max(float(self.min_limit), self.limit / 2)
+                self.min_interval = min(self.max_interval, max(self.base_interval, self.min_interval * 2))
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+                self.min_interval = self.min_interval * 0.5 if self.min_interval > self.base_interval else 0.0
+            if retry_after:
+                self._next_start = max(self._next_start, time.monotonic() + retry_after)
+            REGISTRY.set("strike_upstream_concurrency_limit", int(self.limit))
+            REGISTRY.set("strike_upstream_min_interval_seconds", self.min_interval)
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """
+    closed → (N fallas de sobrecarga seguidas) → open → (cooldown) → half-open:
+    deja pasar UNA request de prueba; si sale bien se cierra, si no vuelve a abrirse.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=120.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown and not self._probing:
+                self._probing = True  # half-open: una sola request de prueba
+                return True
+            return False
+
+    def record(self, overloaded: bool):
+        with self._lock:
+            if not overloaded:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self._probing or self.failures >= self.failure_threshold:
+                    if self.opened_at is None or self._probing:
+                        print(f"[WARN] API con fallas seguidas ({self.failures}): circuito abierto {self.cooldown:.0f}s")
+                    self.opened_at = time.monotonic()
+            self._probing = False
+            REGISTRY.set("strike_upstream_circuit_open", int(self.opened_at is not None))
+
+
+def _is_overload(exc=None, status=None) -> bool:
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(exc, (requests.Timeout, requests.ConnectionError))
+
+
+def _retry_after(resp):
+    try:
+        return min(60.0, float(resp.headers.get("Retry-After", "")))
+    except (TypeError, ValueError):
+        return None
+
+
+class Transport:
+    def __init__(self, cache_dir=None, pool_size=8, timeout=20, retries=2,
+                 backoff_base=0.4, backoff_max=8.0,
+                 circuit_threshold=5, circuit_cooldown=120.0):
+        self.cache_dir = cache_dir          # None = sin cache en disco
+        self.timeout = timeout
+        self.retries = max(1, retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = AdaptiveLimiter(max_limit=pool_size)
+        self.breaker = CircuitBreaker(circuit_threshold, circuit_cooldown)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Contadores (requests reales a la red, 304 y aciertos de cache sin red)
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.not_modified = 0
+        self.cache_hits = 0
+
+    # ---------- cache en disco ----------
+    def _cache_path(self, key):
+        if not self.cache_dir or key is None:
+            return None
+        raw = json.dumps(list(key), ensure_ascii=False).encode("utf-8")
+        return os.path.join(self.cache_dir, hashlib.sha1(raw).hexdigest() + ".json")
+
+    def _cache_read(self, path):
+        if not path:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _cache_write(self, path, entry):
+        if not path:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _bump(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _sleep_backoff(self, attempt):
+        time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt))))
+
+    # ---------- API pública ----------
+    def get_json(self, url, params=None, cache_key=None, ttl=0, stale_ok=False):
+        """
+        GET que devuelve el JSON de la respuesta.
+        Si hay entrada en cache con menos de `ttl` segundos, no toca la red.
+        Si no, revalida con ETag/Last-Modified (304 → se reutiliza el cache).
+        Si la API falla (o el circuito está abierto) y `stale_ok`, devuelve lo último
+        conocido del cache; si no, levanta la última excepción (CircuitOpenError incluida).
+        """
+        path = self._cache_path(cache_key)
+        entry = self._cache_read(path)
+        if entry and ttl and time.time() - entry.get("stored_at", 0) < ttl:
+            self._bump("cache_hits")
+            REGISTRY.inc("strike_upstream_cache_hits_total")
+            return entry["body"]
+
+        try:
+            return self._get_network(url, params, path, entry, ttl)
+        except Exception:
+            if stale_ok and entry:
+                REGISTRY.inc("strike_upstream_stale_served_total")
+                return entry["body"]
+            raise
+
+    def _get_network(self, url, params, path, entry, ttl):
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        last = None
+        for attempt in range(self.retries):
+            if not self.breaker.allow():
+                REGISTRY.inc("strike_upstream_short_circuits_total")
+                raise CircuitOpenError(f"circuito abierto ({last or 'API caída'})")
+
+            self.limiter.acquire()
+            t0 = time.perf_counter()
+            outcome = "error"
+            overloaded = False
+            retry_after = None
+            try:
+                self._bump("requests_sent")
+                r = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+                if r.status_code == 304 and entry:
+                    outcome = "not_modified"
+                    self._bump("not_modified")
+                    entry["stored_at"] = time.time()
+                    self._cache_write(path, entry)
+                    return entry["body"]
+                overloaded = _is_overload(status=r.status_code)
+                if r.status_code == 429:
+                    retry_after = _retry_after(r)
+                r.raise_for_status()
+                body = r.json()
+                outcome = "ok"
+                if path and (r.headers.get("ETag") or r.headers.get("Last-Modified") or ttl):
+                    self._cache_write(path, {
+                        "stored_at": time.time(),
+                        "etag": r.headers.get("ETag"),
+                        "last_modified": r.headers.get("Last-Modified"),
+                        "body": body,
+                    })
+                return body
+            except Exception as e:
+                last = e
+                overloaded = overloaded or _is_overload(exc=e)
+                if attempt + 1 < self.retries:
+                    REGISTRY.inc("strike_upstream_retries_total")
+            finally:
+                self.limiter.release(overloaded, retry_after)
+                self.breaker.record(overloaded)
+                REGISTRY.observe("strike_upstream_request_seconds", time.perf_counter() - t0, outcome=outcome)
+                REGISTRY.inc("strike_upstream_requests_total", outcome=outcome)
+            if attempt + 1 < self.retries:
+                self._sleep_backoff(attempt)
+        raise last
@@ -0,0 +1,97 @@
+# leagues.py
+# Varias ligas/divisiones/temporadas en un mismo proceso.
+# - La liga por defecto sale de los globals de standings_cascade_points_desc.py (LEAGUE_ORDER, ...).
+# - Cada archivo leagues/<id>.json define otra liga (ver leagues/ejemplo.json.example).
+# - En cada refresh se descarga UNA vez la unión de cuentas de todas las ligas (hasta el
+#   SINCE más antiguo) y cada liga arma su tabla desde ese mismo snapshot:
+#   el costo crece con las cuentas únicas, no con ligas × cuentas.
+
+import json, os, re
+from datetime import datetime
+
+import standings_cascade_points_desc as standings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LEAGUES_DIR = os.getenv("LEAGUES_DIR", os.path.join(BASE_DIR, "leagues"))
+LEAGUE_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]*$")  # también va en la URL: /api/<id>/full
+
+
+def _parse_since(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def league_from_dict(league_id: str, data: dict) -> standings.League:
+    """
+    Formato de leagues/<id>.json:
+      {"name": "...", "since": "2025-09-01", "scheduled": 13, "playoff_spots": 8,
+       "teams": [["username", "Equipo"], ...],
+       "aliases": {"username": ["alias", ...]},
+       "extra_users": ["..."],
+       "record_adjustments": {"Equipo": [dW, dL, "vigente desde (opcional)"]},
+       "point_adjustments": {"Equipo": [puntos, "razón", "vigente desde (opcional)"]}}
+    (varios ajustes por equipo: lista de listas; ver timeline.py)
+    """
+    if not data.get("teams"):
+        raise ValueError("la liga no define 'teams'")
+    return standings.League(
+        league_id,
+        [(u, t) for u, t in data["teams"]],
+        aliases=data.get("aliases"),
+        since=_parse_since(data.get("since")),
+        record_adjustments=data.get("record_adjustments"),
+        point_adjustments=data.get("point_adjustments"),
+        extra_users=data.get("extra_users") or (),
+        scheduled=int(data.get("scheduled") or standings.SCHEDULED_GAMES),
+        name=data.get("name"),
+        playoff_spots=int(data["playoff_spots"]) if data.get("playoff_spots") is not None else None,
+    )
+
+
+def load_leagues(folder=None):
+    """Liga por defecto + una por cada leagues/<id>.json válido (los inválidos se saltan con [WARN])."""
+    folder = folder or LEAGUES_DIR
+    leagues = [standings.default_league()]
+    seen = {leagues[0].id}
+    if not os.path.isdir(folder):
+        return leagues
+    for name in sorted(os.listdir(folder)):
+        league_id, ext = os.path.splitext(name)
+        if ext != ".json":
+            continue
+        if not LEAGUE_ID_RE.match(league_id) or league_id in seen:
+            print(f"[WARN] liga '{name}' ignorada (id inválido o repetido)")
+            continue
+        try:
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                leagues.append(league_from_dict(league_id, json.load(f)))
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"[WARN] liga '{name}' ignorada: {e}")
+            continue
+        seen.add(league_id)
+    return leagues
+
+
+def all_usernames(leagues):
+    """Unión de cuentas (principales + alias) de todas las ligas, sin repetir."""
+    out = {}
+    for lg in leagues:
+        for u in lg.all_usernames():
+            out.setdefault(u, None)
+    return list(out)
+
+
+def earliest_since(leagues):
+    return min(lg.since for lg in leagues)
+
+
+def build_shared_snapshot(leagues, poll=None):
+    """Un solo FetchSnapshot para todas las ligas (cada cuenta se descarga una vez)."""
+    return standings.build_snapshot(all_usernames(leagues), poll=poll, since=earliest_since(leagues))
+
+
+def cache_file_for(league, base_cache_file):
+    """Liga por defecto → base_cache_file; el resto → <stem>.<id>.json en la misma carpeta."""
+    if league.id == standings.LEAGUE_ID:
+        return base_cache_file
+    stem, ext = os.path.splitext(base_cache_file)
+    return f"{stem}.{league.id}{ext}"
@@ -0,0 +1,161 @@
+# metrics.py
+# Métricas estilo Prometheus (contadores, gauges, histogramas) sin dependencias.
+# - El updater registra etapas del refresh, latencia de la API, reintentos/fallas, etc.
+#   y al final de cada refresh vuelca el registro a REFRESH_METRICS_FILE.
+# - app.py lee ese archivo y lo expone en /metrics (formato texto de Prometheus).
+
+import json, math, threading, time
+from contextlib import contextmanager
+
+import snapshots
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 60.0)
+
+
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    inner = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + inner + "}"
+
+
+def _fmt_value(v):
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}    # name -> {"type", "help", "buckets"}
+        self._values = {}  # name -> {labels_key: valor | {"buckets": [...], "sum", "count"}}
+
+    # ---------- declaración ----------
+    def _declare(self, name, kind, help_text, buckets=None):
+        with self._lock:
+            if name not in self._meta:
+                self._meta[name] = {"type": kind, "help": help_text, "buckets": list(buckets or [])}
+                self._values[name] = {}
+
+    def counter(self, name, help_text):
+        self._declare(name, "counter", help_text)
+
+    def gauge(self, name, help_text):
+        self._declare(name, "gauge", help_text)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self._declare(name, "histogram", help_text, buckets)
+
+    # ---------- registro ----------
+    def inc(self, name, amount=1, **labels):
+        k = _key(labels)
+        with self._lock:
+            vals = self._values[name]
+            vals[k] = vals.get(k, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[name][_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        k = _key(labels)
+        with self._lock:
+            buckets = self._meta[name]["buckets"]
+            h = self._values[name].get(k)
+            if h is None:
+                h = self._values[name][k] = {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for i, b in enumerate(buckets):
+                if value <= b:
+                    h["buckets"][i] += 1
+            h["sum"] += value
+            h["count"] += 1
+
+    # ---------- exportar ----------
+    def to_dict(self):
+        with self._lock:
+            return {
+                name: {
+                    **meta,
+                    "values": [[list(map(list, k)), v] for k, v in self._values[name].items()],
+                }
+                for name, meta in self._meta.items()
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        reg = cls()
+        for name, m in (data or {}).items():
+            reg._meta[name] = {"type": m["type"], "help": m.get("help", ""), "buckets": m.get("buckets", [])}
+            reg._values[name] = {tuple(tuple(p) for p in k): v for k, v in m.get("values", [])}
+        return reg
+
+    def render(self):
+        """Formato de exposición de texto de Prometheus."""
+        out = []
+        with self._lock:
+            for name, meta in sorted(self._meta.items()):
+                out.append(f"# HELP {name} {meta['help']}")
+                out.append(f"# TYPE {name} {meta['type']}")
+                for k, v in sorted(self._values[name].items()):
+                    if meta["type"] != "histogram":
+                        out.append(f"{name}{_fmt_labels(k)} {_fmt_value(v)}")
+                        continue
+                    for b, c in zip(meta["buckets"], v["buckets"]):
+                        out.append(f"{name}_bucket{_fmt_labels(k, [('le', _fmt_value(float(b)))])} {c}")
+                    out.append(f"{name}_bucket{_fmt_labels(k, [('le', '+Inf')])} {v['count']}")
+                    out.append(f"{name}_sum{_fmt_labels(k)} {_fmt_value(float(v['sum']))}")
+                    out.append(f"{name}_count{_fmt_labels(k)} {v['count']}")
+        return "\n".join(out) + "\n"
+
+
+# Registro del proceso
+REGISTRY = Registry()
+
+# --- Refresh (update_cache.update_data_cache) ---
+REGISTRY.histogram("strike_refresh_stage_seconds", "Duración de cada etapa del refresh (fetch, dedup, filter, aggregate, sort, write)")
+REGISTRY.gauge("strike_refresh_last_stage_seconds", "Duración de cada etapa en el último refresh")
+REGISTRY.histogram("strike_refresh_seconds", "Duración total del refresh")
+REGISTRY.counter("strike_refresh_total", "Refrescos ejecutados, por resultado")
+REGISTRY.gauge("strike_refresh_last_success_timestamp", "Epoch del último refresh exitoso")
+REGISTRY.counter("strike_games_ingested_total", "Juegos nuevos ingresados al store")
+REGISTRY.gauge("strike_refresh_last_games_ingested", "Juegos nuevos ingresados en el último refresh")
+REGISTRY.gauge("strike_refresh_last_upstream_requests", "Requests a la API en el último refresh")
+
+# --- API upstream (http_transport / fetch_page) ---
+REGISTRY.histogram("strike_upstream_request_seconds", "Latencia de cada request a la API de game_history")
+REGISTRY.counter("strike_upstream_requests_total", "Requests a la API, por resultado (ok, not_modified, error)")
+REGISTRY.counter("strike_upstream_retries_total", "Reintentos a la API")
+REGISTRY.counter("strike_upstream_cache_hits_total", "Páginas servidas desde el cache en disco sin tocar la red")
+REGISTRY.counter("strike_upstream_page_failures_total", "Páginas sin datos tras agotar reintentos ([WARN] ... sin datos)")
+
+
+@contextmanager
+def stage(name):
+    """Mide una etapa del refresh (histograma + valor del último refresh)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        REGISTRY.observe("strike_refresh_stage_seconds", dt, stage=name)
+        REGISTRY.set("strike_refresh_last_stage_seconds", dt, stage=name)
+
+
+def dump(path):
+    """Vuelca REGISTRY a un JSON (escritura atómica) para que lo lea la web."""
+    snapshots.atomic_write_bytes(path, json.dumps(REGISTRY.to_dict(), separators=(",", ":")).encode("utf-8"))
+
+
+def load(path):
+    """Registry leído desde el JSON del updater (o None si no existe/está corrupto)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return Registry.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
@@ -0,0 +1,169 @@
+# playoffs.py
+# Clasificados / eliminados / número mágico para los cupos de playoff.
+# - Cada juego da 3 puntos al ganador y 2 al perdedor: con x victorias en sus r juegos
+#   restantes un equipo termina con  puntos + 2r + x,  W + x,  L + r - x.
+#   La tabla se ordena por (puntos, W, -L) (ver timeline.sort_rows), así que "quién queda
+#   arriba" depende sólo de cuántas de sus r gana cada equipo → todo se reduce a contar victorias.
+# - La liga también cuenta juegos miembro vs CPU, así que en general no se sabe contra
+#   quién son los restantes: cualquier juego de un rival puede ser contra la CPU y ganarlo
+#   (o perderlo) sin que nadie más sume. Sin emparejamientos, "clinched" exige que no
+#   alcancen a pasarlo `spots` rivales aun ganando cada uno todo lo suyo, y "eliminated"
+#   que `spots` rivales ya estén arriba aun perdiendo todo: vale para cualquier calendario.
+# - Si el cara a cara muestra una liga todos contra todos a una vuelta (scheduled = equipos
+#   - 1, ningún par repetido, y a cada equipo le quedan justo los rivales que aún no
+#   enfrenta), los restantes son esos cruces: los juegos entre rivales reparten un número
+#   fijo de victorias (un ganador por juego) y cada rival absorbe hasta sus r. Es la cota
+#   del flujo máximo sin emparejar: sólo marca lo que vale para ese calendario.
+# - Empates exactos en (puntos, W, L) cuentan en contra del equipo evaluado.
+# - O(n log n) por equipo (un sort + búsqueda binaria para el número mágico): milisegundos
+#   aun con ligas grandes.
+
+import os
+
+PLAYOFF_SPOTS = int(os.getenv("PLAYOFF_SPOTS", "8"))
+
+
+def _key(row, x):
+    """(puntos, W, -L) final si el equipo gana x de sus restantes y pierde el resto."""
+    r = row["remaining"]
+    return (row["points"] + 2 * r + x, row["wins"] + x, -(row["losses"] + r - x))
+
+
+def _wins_to_reach(row, target):
+    """Mínimo de victorias (de sus restantes) para quedar >= target; None si no le alcanza."""
+    r = row["remaining"]
+    x = max(0, target[0] - row["points"] - 2 * r)
+    for x in (x, x + 1):  # con los puntos iguales decide W/L; con uno más ya pasa
+        if x > r:
+            return None
+        if _key(row, x) >= target:
+            return x
+    return None
+
+
+def _wins_without_passing(row, target):
+    """Máximo de victorias sin quedar por encima de target; -1 si ya está arriba con 0."""
+    r = row["remaining"]
+    x = min(r, target[0] - row["points"] - 2 * r)
+    while x >= 0 and _key(row, x) > target:
+        x -= 1
+    return x
+
+
+def _remaining_pairs(rows, stats):
+    """
+    {equipo: [rivales pendientes]} si los restantes se deducen del cara a cara (todos contra
+    todos a una vuelta, ver arriba); None si no (p.ej. hubo o puede haber juegos vs CPU).
+    """
+    if stats is None:
+        return None
+    teams = [r["team"] for r in rows]
+    pending = {}
+    for row in rows:
+        if row.get("scheduled") != len(teams) - 1:
+            return None
+        unfaced = []
+        for other in teams:
+            if other == row["team"]:
+                continue
+            played = stats.played(row["team"], other)
+            if played > 1:
+                return None
+            if played == 0:
+                unfaced.append(other)
+        if len(unfaced) != row["remaining"]:
+            return None
+        pending[row["team"]] = unfaced
+    return pending
+
+
+def _clinches(i, rows, x, spots, total_remaining, among=None):
+    """
+    ¿Termina i entre los `spots` primeros si gana x de sus restantes y pierde el resto?
+    among: juegos restantes entre los rivales de i (None = calendario desconocido).
+    """
+    me = rows[i]
+    target = _key(me, x)
+    r = me["remaining"]
+    if among is None:
+        # Cada rival puede ganar todo lo que le queda (contra la CPU, o contra i)
+        pool = total_remaining - r
+    else:
+        # Las r - x que pierde i + una por cada juego entre ellos
+        pool = (r - x) + among
+    needs = []
+    for j, other in enumerate(rows):
+        if j != i:
+            need = _wins_to_reach(other, target)
+            if need is not None:
+                needs.append(need)
+    needs.sort()
+    passing = 0
+    for need in needs:  # los que pasan con menos victorias primero: máximo de equipos por encima
+        if need > pool:
+            break
+        pool -= need
+        passing += 1
+    return passing < spots
+
+
+def _eliminated(i, rows, spots, among=None):
+    """¿Queda i fuera de los `spots` aun ganando todos sus restantes? (among: ver _clinches)"""
+    me = rows[i]
+    target = _key(me, me["remaining"])
+    # Juegos entre los demás (los de i los gana i): cada uno da una victoria a un rival.
+    # Sin calendario, todos pueden ser contra la CPU y perderse: no hay nada que repartir.
+    to_place = among or 0
+    ahead, caps, extra = 0, 0, []
+    for j, other in enumerate(rows):
+        if j == i:
+            continue
+        cap = _wins_without_passing(other, target)
+        if cap < 0:
+            ahead += 1
+            caps += other["remaining"]  # ya está arriba: puede ganar todos los suyos
+        else:
+            caps += cap
+            extra.append(other["remaining"] - cap)
+    free = spots - 1 - ahead  # rivales que aún pueden pasarlo sin dejarlo fuera
+    if free < 0:
+        return True
+    extra.sort(reverse=True)
+    return caps + sum(extra[:free]) < to_place
+
+
+def annotate_playoff_race(rows, spots=None, stats=None):
+    """
+    Agrega a cada fila (en el lugar):
+      "clinched": True si termina entre los `spots` primeros pase lo que pase,
+      "eliminated": True si no puede terminar entre ellos,
+      "magic_number": victorias propias (de sus restantes) que le aseguran el cupo;
+                      0 si ya clasificó, None si ni ganando todo lo asegura.
+    stats: cara a cara (TeamStats / vista de TeamStatsHistory, con played()) para deducir
+    los cruces restantes; sin él se usa la cota para cualquier calendario.
+    """
+    spots = PLAYOFF_SPOTS if spots is None else spots
+    total_remaining = sum(r["remaining"] for r in rows)
+    pending = _remaining_pairs(rows, stats)
+    total_pairs = sum(len(v) for v in pending.values()) // 2 if pending is not None else None
+    for i, row in enumerate(rows):
+        if spots <= 0:
+            row.update(clinched=False, eliminated=True, magic_number=None)
+            continue
+        r = row["remaining"]
+        among = total_pairs - r if pending is not None else None
+        magic = None
+        if _clinches(i, rows, r, spots, total_remaining, among):
+            lo, hi = 0, r  # la menor x que clasifica (más victorias nunca empeoran)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if _clinches(i, rows, mid, spots, total_remaining, among):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            magic = lo
+        eliminated = magic is None and _eliminated(i, rows, spots, among)
+        row["clinched"] = magic == 0
+        row["eliminated"] = eliminated
+        row["magic_number"] = magic
+    return rows
@@ -0,0 +1,67 @@
+# replay.py
+# Recalcula la tabla y los juegos del día desde la bitácora de capturas (capture_log.py), sin red.
+# Usa la configuración ACTUAL (LEAGUE_ORDER, alias, ajustes, leagues/*.json): sirve para
+# re-puntuar la temporada completa tras cambiar reglas o ajustes.
+#
+# Uso:
+#   python replay.py                                   # liga por defecto, bitácora de out/
+#   python replay.py --league segunda --day last       # otra liga; último día con juegos
+#   python replay.py --log otra/capture.ndjson.gz --day 2025-09-05 --json salida.json
+
+import argparse, json, os, time
+
+import standings_cascade_points_desc as standings
+import leagues
+from capture_log import read_histories
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Tabla y juegos del día desde la bitácora de capturas (sin red)")
+    ap.add_argument("--log", default=standings.CAPTURE_LOG_FILE, help="bitácora NDJSON gzip")
+    ap.add_argument("--league", default=standings.LEAGUE_ID, help="id de liga (ver leagues/)")
+    ap.add_argument("--day", help="'YYYY-MM-DD' o 'last' (por defecto: hoy, como games_played_today_scl)")
+    ap.add_argument("--json", help="además escribe {standings, games} en este archivo")
+    args = ap.parse_args()
+
+    if not os.path.exists(args.log):
+        raise SystemExit(f"No existe la bitácora {args.log} (se genera con DUMP_ENABLED)")
+    by_id = {lg.id: lg for lg in leagues.load_leagues()}
+    league = by_id.get(args.league)
+    if league is None:
+        raise SystemExit(f"Liga desconocida '{args.league}' (hay: {', '.join(by_id)})")
+
+    # Sin capturas ni dumps durante el replay
+    standings.DUMP_ENABLED = False
+    standings.PRINT_CAPTURE_SUMMARY = standings.PRINT_CAPTURE_LIST = False
+
+    t0 = time.perf_counter()
+    histories = read_histories(args.log)
+    t1 = time.perf_counter()
+    snapshot = standings.snapshot_from_histories(
+        {u: histories.get(u, []) for u in league.all_usernames()})
+    rows = standings.compute_rows(snapshot, league)
+    index = standings.day_index(snapshot, league)
+    if args.day == "last":
+        days = index.days()
+        day = days[-1] if days else standings.current_day()
+    else:
+        day = args.day or standings.current_day()
+    games = list(index.lines(day))
+    t2 = time.perf_counter()
+
+    standings.print_standings(rows)
+    standings.print_games(f"Juegos del {day} (hora Chile)", games, "— No hay registros ese día —")
+    n_games = sum(len(v) for v in histories.values())
+    print(f"\nBitácora: {len(histories)} cuentas, {n_games} juegos  "
+          f"(lectura {t1 - t0:.3f}s, cálculo {t2 - t1:.3f}s)")
+
+    if args.json:
+        for r in rows:
+            r.pop("detail", None)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"league": league.id, "day": day, "standings": rows, "games": games},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# rules.py
+# Correcciones manuales en UN archivo (rules.json), recargado en caliente:
+# - exclusiones de juegos (disputados, duplicados, mal cargados) por id o por contenido,
+# - ajustes de W/L y de puntos por equipo, con fecha de vigencia opcional (ver timeline.py).
+# Se compila a índices hash: cada juego se revisa con una o dos búsquedas en dict al
+# ingresarlo (LeagueAggregator / DayIndex), no recorriendo reglas ni strings ya formateados.
+# Se relee cuando cambia el mtime/tamaño del archivo: el updater no necesita reiniciarse.
+#
+# Formato de rules.json:
+#   {"exclude_games": [
+#       {"id": "123456789", "reason": "Juego disputado"},
+#       {"home_team": "Yankees", "away_team": "Mets", "home_runs": 0, "away_runs": 0,
+#        "date": "2025-09-08 21:40", "reason": "..."}          # fecha/hora Chile, al minuto
+#    ],
+#    "record_adjustments": {"Equipo": [dW, dL, "vigente desde (opcional)"]},
+#    "point_adjustments": {"Equipo": [puntos, "razón", "vigente desde (opcional)"]}}
+# Los ajustes son de la liga por defecto; las otras ligas los llevan en leagues/<id>.json
+# (que también se relee en cada refresh). Las exclusiones valen para todas las ligas.
+
+import hashlib, json, os, threading
+
+from timeline import parse_local_time, normalize_record_adjustments, normalize_point_adjustments
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_FILE = os.getenv("RULES_FILE", os.path.join(BASE_DIR, "rules.json"))
+
+
+def _runs_key(value) -> str:
+    try:
+        return str(int(value))
+    except (TypeError, ValueError):
+        return str(value or "0").strip()
+
+
+def _content_key(home_team, away_team, home_runs, away_runs, minute):
+    return (str(home_team).strip().lower(), str(away_team).strip().lower(),
+            _runs_key(home_runs), _runs_key(away_runs), minute)
+
+
+class Rules:
+    def __init__(self, data=None):
+        data = data or {}
+        self.excluded_ids = {}      # id -> razón
+        self.excluded_content = {}  # (local, visita, carreras local, carreras visita, minuto epoch) -> razón
+        for rule in data.get("exclude_games") or []:
+            reason = rule.get("reason", "")
+            if rule.get("id"):
+                self.excluded_ids[str(rule["id"])] = reason
+            elif all(rule.get(k) is not None for k in ("home_team", "away_team", "date")):
+                minute = parse_local_time(rule["date"]) // 60
+                key = _content_key(rule["home_team"], rule["away_team"],
+                                   rule.get("home_runs"), rule.get("away_runs"), minute)
+                self.excluded_content[key] = reason
+            else:
+                print(f"[WARN] regla de exclusión ignorada (falta id o home_team/away_team/date): {rule}")
+        # Ya normalizados: una fecha o forma inválida falla aquí (load_rules mantiene las reglas anteriores)
+        self.record_adjustments = normalize_record_adjustments(data.get("record_adjustments"))
+        self.point_adjustments = normalize_point_adjustments(data.get("point_adjustments"))
+        # Cambia sólo si cambian las exclusiones (lo que decide qué juegos cuentan)
+        blob = json.dumps([sorted(self.excluded_ids), sorted(map(list, self.excluded_content))])
+        self.signature = hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+    def exclusion_reason(self, g):
+        """Razón si el juego (Game) está excluido; None si no."""
+        reason = self.excluded_ids.get(g.key)
+        if reason is not None or not self.excluded_content or g.ts is None:
+            return reason
+        return self.excluded_content.get(
+            _content_key(g.home_team_key, g.away_team_key, g.home_runs, g.away_runs, g.ts // 60))
+
+    def excludes(self, g) -> bool:
+        return self.exclusion_reason(g) is not None
+
+
+_lock = threading.Lock()
+_cache = {}  # path -> (firma del archivo, Rules)
+
+
+def load_rules(path=None) -> Rules:
+    """
+    Reglas vigentes de `path` (RULES_FILE por defecto). Un os.stat por llamada; se
+    recompila sólo si el archivo cambió. Si el archivo nuevo no es válido se sigue
+    con las reglas anteriores ([WARN]); sin archivo, sin reglas.
+    """
+    path = path or RULES_FILE
+    try:
+        st = os.stat(path)
+        sig = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        sig = None
+    cached = _cache.get(path)
+    if cached and cached[0] == sig:
+        return cached[1]
+    with _lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == sig:
+            return cached[1]
+        if sig is None:
+            rules = Rules()
+        else:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    rules = Rules(json.load(f))
+            except (OSError, ValueError, TypeError, AttributeError) as e:
+                print(f"[WARN] {os.path.basename(path)} inválido, se mantienen las reglas anteriores: {e}")
+                rules = cached[1] if cached else Rules()
+            else:
+                if cached:
+                    print(f"[INFO] {os.path.basename(path)} recargado")
+        _cache[path] = (sig, rules)
+        return rules
@@ -0,0 +1,141 @@
+# snapshots.py
+# Escritura/lectura de snapshots del cache (standings_cache.json).
+# - Escritura atómica: archivo temporal + fsync + rename (nunca se lee un JSON a medias).
+# - JSON compacto, con "version" creciente y "hash" del contenido.
+# - Se guardan los últimos SNAPSHOT_KEEP snapshots en snapshots/ para que la web
+#   pueda caer al anterior si el actual no se puede leer.
+
+import json, os, re, hashlib, tempfile
+
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "10"))
+_META_KEYS = ("version", "hash")
+
+
+def history_dir(cache_file: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(cache_file)), "snapshots")
+
+
+def _history_name(cache_file: str, version: int) -> str:
+    stem = os.path.splitext(os.path.basename(cache_file))[0]
+    return os.path.join(history_dir(cache_file), f"{stem}.v{version:08d}.json")
+
+
+def _history_re(cache_file: str):
+    stem = os.path.splitext(os.path.basename(cache_file))[0]
+    return re.compile(re.escape(stem) + r"\.v(\d+)\.json$")
+
+
+def content_hash(payload: dict) -> str:
+    """sha256 del contenido (sin version/hash), con claves ordenadas."""
+    body = {k: v for k, v in payload.items() if k not in _META_KEYS}
+    raw = json.dumps(body, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def encode(payload: dict) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """tmp en la misma carpeta + fsync + os.replace (+ fsync de la carpeta si se puede)."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    try:
+        dfd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return  # Windows: no se puede abrir una carpeta
+    try:
+        os.fsync(dfd)
+    except OSError:
+        pass
+    finally:
+        os.close(dfd)
+
+
+def history_versions(cache_file: str):
+    """Versiones guardadas en snapshots/, de la más nueva a la más vieja."""
+    folder = history_dir(cache_file)
+    if not os.path.isdir(folder):
+        return []
+    pat = _history_re(cache_file)
+    out = []
+    for name in os.listdir(folder):
+        m = pat.match(name)
+        if m:
+            out.append(int(m.group(1)))
+    return sorted(out, reverse=True)
+
+
+def _current_version(cache_file: str) -> int:
+    versions = history_versions(cache_file)
+    if versions:
+        return versions[0]
+    try:
+        return int(load(cache_file).get("version") or 0)
+    except (OSError, ValueError, TypeError):
+        return 0
+
+
+def write_snapshot(cache_file: str, payload: dict, keep: int = None) -> dict:
+    """
+    Publica un snapshot nuevo: version = anterior + 1, hash del contenido,
+    copia en snapshots/ y reemplazo atómico de cache_file. Devuelve el payload final.
+    """
+    keep = SNAPSHOT_KEEP if keep is None else keep
+    payload = {k: v for k, v in payload.items() if k not in _META_KEYS}
+    payload["version"] = _current_version(cache_file) + 1
+    payload["hash"] = content_hash(payload)
+    data = encode(payload)
+
+    if keep > 0:
+        atomic_write_bytes(_history_name(cache_file, payload["version"]), data)
+    atomic_write_bytes(cache_file, data)
+
+    for old in history_versions(cache_file)[max(keep, 0):]:
+        try:
+            os.remove(_history_name(cache_file, old))
+        except OSError:
+            pass
+    return payload
+
+
+def load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_version(cache_file: str, version: int):
+    """Snapshot de una versión puntual desde snapshots/ (None si ya no está)."""
+    try:
+        return load(_history_name(cache_file, int(version)))
+    except (OSError, ValueError):
+        return None
+
+
+def load_latest(cache_file: str) -> dict:
+    """
+    Snapshot vigente. Si cache_file no se puede leer/parsear, cae al snapshot
+    válido más reciente de snapshots/. FileNotFoundError si no hay ninguno.
+    """
+    try:
+        return load(cache_file)
+    except (OSError, ValueError) as e:
+        err = e
+    for v in history_versions(cache_file):
+        data = load_version(cache_file, v)
+        if data is not None:
+            return data
+    raise err
@@ -2,10 +2,21 @@
 # Tabla de posiciones (2 páginas por jugador) con columnas:
 # Pos | Equipo | Jugador | Prog(13) | JJ | W | L | Por jugar | Pts
 # Reglas: LEAGUE + fecha, filtro (ambos miembros) o (CPU + miembro), dedup por id, ajustes algebraicos.
-# Orden: por puntos (desc). Empates: por W (desc), luego L (asc).
+# Orden: por puntos (desc). Empates: por W (desc), luego L (asc), cara a cara y diferencia de carreras.
 
-import requests, time, re, os, json
+import os, json, time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from game_store import GameStore
+from capture_log import CaptureLog
+from game_record import Game, game_key, normalize_user_for_compare, parse_date, epoch_utc
+from game_record import current_day as _current_day
+from http_transport import Transport
+from metrics import REGISTRY, stage
+from timeline import Timeline, make_row, sort_rows, normalize_record_adjustments, normalize_point_adjustments
+from playoffs import PLAYOFF_SPOTS, annotate_playoff_race
+from team_stats import TeamStats
+from rules import load_rules
 # ===== Config general =====
 
 # ===== MODO DE EJECUCIÓN (switch) =====
@@ -17,7 +28,7 @@ CFG = {
         PRINT_DETAILS=False,          # igual que ahora
         PRINT_CAPTURE_SUMMARY=True,   # imprime resumen por equipo
         PRINT_CAPTURE_LIST=False,     # NO lista juego por juego
-        DUMP_ENABLED=True,            # genera JSON en carpeta out/
+        DUMP_ENABLED=True,            # bitácora de capturas + JSON en carpeta out/
         STOP_AFTER_N=None,            # procesa todos
         DAY_WINDOW_MODE="calendar",   # "hoy" = día calendario Chile (00:00–23:59)
     ),
@@ -25,7 +36,7 @@ CFG = {
         PRINT_DETAILS=False,          # silencioso en prod
         PRINT_CAPTURE_SUMMARY=False,  # sin resúmenes
         PRINT_CAPTURE_LIST=False,     # sin listado
-        DUMP_ENABLED=False,           # sin JSONs
+        DUMP_ENABLED=False,           # sin bitácora ni JSONs
         STOP_AFTER_N=None,            # todos
         DAY_WINDOW_MODE="sports",     # "hoy" = 06:00–05:59 (día deportivo Chile)
     ),
@@ -69,9 +80,34 @@ API = "https://mlb25.theshow.com/apis/game_history.json"
 PLATFORM = "psn"
 MODE = "LEAGUE"
 SINCE = datetime(2025, 8, 23)
-PAGES = (1, 2, 3)          # <-- SOLO p1 y p2, como validaste
+# Paginación adaptativa por usuario: se sigue mientras el juego más viejo de la
+# última página sea posterior a SINCE; se corta en página vacía. MAX_PAGES es solo un tope de seguridad.
+MAX_PAGES = int(os.getenv("MAX_PAGES", "20"))
 TIMEOUT = 20
 RETRIES = 2
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "8"))  # máx. requests simultáneos a la API
+
+# === Transporte HTTP (sesión con pool + cache en disco con ETag/If-Modified-Since) ===
+HTTP_CACHE_DIR = os.getenv(
+    "HTTP_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache"),
+)
+# Sólo p1 se sirve desde cache sin red mientras esté fresca; las páginas más
+# profundas se corren cuando entran juegos nuevos, así que siempre se revalidan (304).
+PAGE1_CACHE_TTL = int(os.getenv("PAGE1_CACHE_TTL", "30"))
+# Circuit breaker: tras N fallas seguidas (429/5xx/timeout) no se llama a la API por COOLDOWN s;
+# esos usuarios quedan con lo último conocido (store / cache de p1).
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_COOLDOWN_SECONDS = int(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "120"))
+
+# === Almacén local de juegos (ingesta incremental) ===
+# True: cada refresh sólo baja lo nuevo y calcula desde games.sqlite3
+# False: descarga completa (hasta SINCE) en cada refresh, sin guardar nada
+USE_GAME_STORE = True
+GAME_STORE_FILE = os.getenv(
+    "GAME_STORE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "games.sqlite3"),
+)
 
 # Mostrar detalle por equipo (línea a línea). Deja False para tabla limpia.
 PRINT_DETAILS = False
@@ -80,8 +116,11 @@ PRINT_DETAILS = False
 STOP_AFTER_N = None
 
 # === Capturas / dumps ===
-DUMP_ENABLED = True
+# DUMP_ENABLED sale del modo (CFG arriba: sólo DEBUG). Con él cada página bajada de la API
+# se agrega a CAPTURE_LOG_FILE (NDJSON gzip, ver capture_log.py); replay.py recalcula tabla
+# y juegos del día desde ahí, sin red. En ONLINE no se escribe nada: la bitácora no rota.
 DUMP_DIR = "out"
+CAPTURE_LOG_FILE = os.getenv("CAPTURE_LOG_FILE", os.path.join(DUMP_DIR, "capture.ndjson.gz"))
 PRINT_CAPTURE_SUMMARY = True   # imprime resumen capturas por equipo
 PRINT_CAPTURE_LIST = False     # lista cada juego capturado (puede ser muy verboso)
 
@@ -112,18 +151,12 @@ FETCH_ALIASES = {
     # "OtroPrincipal": ["Alias1", "Alias2"],
 }
 
-# ===== Ajustes algebraicos por equipo (resets W/L) =====
-TEAM_RECORD_ADJUSTMENTS = {
-    "Blue Jays": (0, -1),
-    "Brewers": (-1, 0),
-}
-
-# ===== Ajustes manuales de PUNTOS (desconexiones, sanciones, bonificaciones) =====
-# Formato: "Equipo": (ajuste_en_puntos, "razón del ajuste")
-TEAM_POINT_ADJUSTMENTS = {
-     # "Padres": (-1, "Desconexión vs Blue Jays"),
-    # "Cubs": (+1, "Bonificación fair play"),
-}
+# ===== Ajustes de W/L, de PUNTOS y exclusiones de juegos =====
+# Viven en rules.json (ver rules.py): se recargan en caliente, sin redeploy ni reinicio.
+#   "record_adjustments": {"Equipo": [dW, dL, "vigente desde (opcional)"]}
+#   "point_adjustments":  {"Equipo": [puntos, "razón", "vigente desde (opcional)"]}
+#   "exclude_games":      [{"id": "..."} o {"home_team", "away_team", "home_runs", "away_runs", "date"}]
+# Fecha/hora Chile ("2025-09-05" o "2025-09-05 21:00"); sin fecha aplica siempre.
 
 # ===== Miembros de liga (para el filtro de rival) =====
 # Incluye principales + alias para que NINGÚN partido válido se descarte por “no miembro”
@@ -135,12 +168,52 @@ for base, alts in FETCH_ALIASES.items():
 LEAGUE_USERS.update({"AiramReynoso_", "Yosoyreynoso_"})
 LEAGUE_USERS_NORM = {u.lower() for u in LEAGUE_USERS}
 
-# ===== Utilidades =====
-BXX_RE = re.compile(r"\^(b\d+)\^", flags=re.IGNORECASE)
-
-def _safe_name(s: str) -> str:
-    return re.sub(r"[^A-Za-z0-9._-]+", "_", s or "")
+# ===== Definición de liga =====
+# La liga de arriba (globals del módulo) es la liga por defecto, con id LEAGUE_ID.
+# Otras divisiones/temporadas se definen en leagues/<id>.json (ver leagues.py).
+LEAGUE_ID = os.getenv("DEFAULT_LEAGUE", "principal")
+SCHEDULED_GAMES = 13
+
+class League:
+    """Configuración de una liga: equipos, alias, SINCE, ajustes y miembros."""
+
+    def __init__(self, league_id, order, aliases=None, since=None, record_adjustments=None,
+                 point_adjustments=None, extra_users=(), scheduled=SCHEDULED_GAMES, name=None,
+                 playoff_spots=None):
+        self.id = league_id
+        self.name = name or league_id
+        self.order = [tuple(x) for x in order]                 # [(username, equipo)]
+        self.aliases = dict(aliases or {})                     # {username: [alias, ...]}
+        self.since = since or SINCE
+        self.record_adjustments = normalize_record_adjustments(record_adjustments)  # {equipo: [(dW, dL, vigencia)]}
+        self.point_adjustments = normalize_point_adjustments(point_adjustments)     # {equipo: [(pts, razón, vigencia)]}
+        self.scheduled = scheduled
+        self.playoff_spots = PLAYOFF_SPOTS if playoff_spots is None else playoff_spots  # ver playoffs.py
+        self.users = {u for (u, _t) in self.order}
+        for base, alts in self.aliases.items():
+            self.users.add(base)
+            self.users.update(alts)
+        self.users.update(extra_users)
+        self.users_norm = {u.lower() for u in self.users}
+
+    def usernames_for(self, username_exact: str):
+        return [username_exact] + list(self.aliases.get(username_exact, []))
+
+    def all_usernames(self):
+        out = []
+        for user, _team in self.order:
+            out += self.usernames_for(user)
+        return out
+
+def default_league() -> League:
+    """La liga de los globals del módulo + ajustes de rules.json (se arma en cada llamada: respeta cambios en caliente)."""
+    rules = load_rules()
+    return League(
+        LEAGUE_ID, LEAGUE_ORDER, FETCH_ALIASES, SINCE,
+        rules.record_adjustments, rules.point_adjustments, extra_users=LEAGUE_USERS,
+    )
 
+# ===== Utilidades =====
 def _dump_json(filename: str, data):
     if not DUMP_ENABLED:
         return
@@ -150,171 +223,469 @@ def _dump_json(filename: str, data):
         json.dump(data, f, ensure_ascii=False, indent=2)
     return path
 
-def normalize_user_for_compare(raw: str) -> str:
-    if not raw: return ""
-    return BXX_RE.sub("", raw).strip().lower()
-
+# normalize_user_for_compare / parse_date viven en game_record.py (se usan al parsear cada Game)
 def is_cpu(raw: str) -> bool:
     return normalize_user_for_compare(raw) == "cpu"
 
-def parse_date(s: str):
-    for fmt in ("%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M"):
-        try:
-            return datetime.strptime(s, fmt)
-        except:
-            pass
-    return None
+CAPTURE_LOG = CaptureLog(CAPTURE_LOG_FILE)
 
-def fetch_page(username: str, page: int):
+# Todas las llamadas a la API pasan por aquí
+TRANSPORT = Transport(
+    cache_dir=HTTP_CACHE_DIR,
+    pool_size=MAX_IN_FLIGHT,
+    timeout=TIMEOUT,
+    retries=RETRIES,
+    circuit_threshold=CIRCUIT_FAILURE_THRESHOLD,
+    circuit_cooldown=CIRCUIT_COOLDOWN_SECONDS,
+)
+
+def upstream_request_count() -> int:
+    """Requests reales enviados a la API (incluye reintentos y 304)."""
+    return TRANSPORT.requests_sent
+
+def _fetch_page_or_none(username: str, page: int):
+    """Como fetch_page(), pero devuelve None si la API falló (≠ página vacía)."""
     params = {"username": username, "platform": PLATFORM, "page": page}
-    last = None
-    for _ in range(RETRIES):
-        try:
-            r = requests.get(API, params=params, timeout=TIMEOUT)
-            r.raise_for_status()
-            return (r.json() or {}).get("game_history") or []
-        except Exception as e:
-            last = e
-            time.sleep(0.4)
-    print(f"[WARN] {username} p{page} sin datos ({last})")
-    return []
+    t0 = time.perf_counter()
+    try:
+        data = TRANSPORT.get_json(
+            API, params,
+            cache_key=(username, PLATFORM, page),
+            ttl=PAGE1_CACHE_TTL if page == 1 else 0,
+            # sólo p1 puede caer a lo último conocido: una p2+ vieja podría saltarse juegos corridos
+            stale_ok=(page == 1),
+        )
+    except Exception as e:
+        REGISTRY.inc("strike_upstream_page_failures_total")
+        print(f"[WARN] {username} p{page} sin datos ({e})")
+        if DUMP_ENABLED:
+            CAPTURE_LOG.record_error(username, PLATFORM, page, e)
+        return None
+    items = (data or {}).get("game_history") or []
+    if DUMP_ENABLED:
+        CAPTURE_LOG.record_page(username, PLATFORM, page, items, time.perf_counter() - t0)
+    return items
+
+def fetch_page(username: str, page: int):
+    return _fetch_page_or_none(username, page) or []
+
+def page_user(username: str, known=None, complete=False, since=None):
+    """
+    Pagina el historial de una cuenta desde p1 y corta apenas:
+      - la página viene vacía,
+      - el juego más viejo de la página es anterior a `since` (SINCE por defecto),
+      - aparece un id ya guardado (sólo si el historial ya estaba completo en el store),
+      - la API falla, o se llega a MAX_PAGES.
+    Devuelve (páginas, completo, motivo); completo=None significa "no tocar el estado".
+    """
+    known = known or set()
+    since = since or SINCE
+    pages = []
+    for p in range(1, MAX_PAGES + 1):
+        page_items = _fetch_page_or_none(username, p)
+        if page_items is None:
+            # Falla de la API: si alcanzamos a bajar algo quedó un hueco → releer completo la próxima vez
+            return pages, (False if pages else None), f"error API en p{p}"
+        if not page_items:
+            return pages, True, f"página vacía en p{p}"
+        pages.append(page_items)
+        if complete and any(game_key(g) in known for g in page_items):
+            return pages, True, "id conocido"
+        dates = [d for d in (parse_date(g.get("display_date", "")) for g in page_items) if d]
+        if dates and min(dates) < since:
+            return pages, True, "anterior a SINCE"
+    return pages, False, f"tope MAX_PAGES={MAX_PAGES}"
+
+def _log_paging(username: str, pages, reason: str):
+    print(f"    [paginas] {username}: {len(pages)} pág. con datos ({reason})")
+
+def fetch_pages_concurrent(usernames, max_in_flight=None, since=None):
+    """
+    Descarga completa (sin store): cada cuenta se pagina adaptativamente en su
+    propio hilo, a lo más `max_in_flight` en paralelo.
+    Devuelve {username: [items_p1, items_p2, ...]} con los dicts de la API.
+    """
+    users = list(dict.fromkeys(usernames))  # sin repetidos, respetando orden
+    if not users:
+        return {}
+    workers = max(1, min(max_in_flight or MAX_IN_FLIGHT, len(users)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        out = {}
+        results = pool.map(lambda u: page_user(u, since=since), users)
+        for u, (pages, _done, reason) in zip(users, results):
+            _log_paging(u, pages, reason)
+            out[u] = pages
+        return out
+
+def usernames_for(username_exact: str, league=None):
+    """Cuenta principal + alias (FETCH_ALIASES) de un participante."""
+    return (league or default_league()).usernames_for(username_exact)
+
+def all_league_usernames(league=None):
+    """Todas las cuentas a descargar para la liga (principales + alias)."""
+    return (league or default_league()).all_usernames()
+
+# ===== Snapshot de descargas (una sola vez por refresh) =====
+class FetchSnapshot:
+    """
+    Páginas de game_history descargadas UNA vez por refresh para todas las
+    cuentas de la liga (principales + FETCH_ALIASES). La tabla, los juegos de hoy
+    y cualquier reporte futuro leen de aquí en vez de volver a llamar a la API.
+    Los juegos son Game (game_record.py), y un mismo juego visto en varios
+    historiales es el MISMO objeto.
+    """
+
+    def __init__(self, pages_by_user, requests_made=0, new_games=None):
+        self.pages_by_user = pages_by_user      # {username: [[Game, ...], ...]}
+        self.requests_made = requests_made      # requests a la API hechos para armarlo
+        self.new_games = new_games              # juegos nuevos ingresados al store (None = sin store)
+        self.fetched_at = datetime.now()
+        self._day_indexes = {}                  # league.id -> DayIndex
+        self._aggregates = {}                   # league.id -> LeagueAggregator (ver aggregate_league)
+
+    def day_index(self, league):
+        """
+        Índice por día de la liga (se actualiza la primera vez que se pide en este refresh).
+        Como el agregado (ver aggregate_league), el índice del refresh anterior sigue vivo si
+        la liga filtra igual: sólo se le agregan los juegos que no había visto.
+        """
+        idx = self._day_indexes.get(league.id)
+        if idx is None:
+            idx = _live_day_indexes.get(league.id)
+            if idx is None or idx.signature != _day_index_signature(league):
+                idx = DayIndex((), league)
+            idx.add_games(self.games_for(league.all_usernames()))
+            self._day_indexes[league.id] = _live_day_indexes[league.id] = idx
+        return idx
+
+    def pages(self, username: str):
+        """Lista de páginas (lista de listas) de una cuenta; [] si no se descargó."""
+        return self.pages_by_user.get(username, [])
+
+    def games_for(self, usernames):
+        """Juegos (sin deduplicar) de varias cuentas, en orden de página."""
+        out = []
+        for u in usernames:
+            for page_items in self.pages(u):
+                out += page_items
+        return out
+
+    def all_games(self):
+        return self.games_for(self.pages_by_user.keys())
+
+def _share_games(pages_by_user, parse=None):
+    """Un solo objeto Game por clave entre todas las cuentas (parseando dicts si `parse`)."""
+    by_key = {}
+    out = {}
+    for u, pages in pages_by_user.items():
+        out[u] = []
+        for page_items in pages:
+            shared = []
+            for g in page_items:
+                if parse:
+                    key = game_key(g)
+                    rec = by_key.get(key) or by_key.setdefault(key, Game.from_api(g, key))
+                else:
+                    rec = by_key.setdefault(g.key, g)
+                shared.append(rec)
+            out[u].append(shared)
+    return out
+
+def snapshot_from_histories(histories) -> FetchSnapshot:
+    """FetchSnapshot desde historiales ya bajados ({username: [juego de la API, ...]}), sin red (replay.py)."""
+    return FetchSnapshot(_share_games({u: [items] for u, items in histories.items()}, parse=True))
+
+def ingest_users(store: GameStore, usernames, max_in_flight=None, since=None) -> int:
+    """
+    Ingesta incremental: cada cuenta se pagina en su propio hilo (a lo más
+    max_in_flight en paralelo) y lo nuevo se guarda en el store desde este hilo.
+    Devuelve cuántos juegos nuevos (por cuenta) se ingresaron.
+    """
+    users = list(dict.fromkeys(usernames))
+    if not users:
+        return 0
+    since = since or SINCE
+    since_ts = epoch_utc(since)
+    # Completo hasta una fecha posterior a `since` (p.ej. liga nueva con SINCE más antiguo) = incompleto
+    state = {u: (store.known_ids(u), store.is_complete(u, since_ts)) for u in users}
+    workers = max(1, min(max_in_flight or MAX_IN_FLIGHT, len(users)))
+    new_total = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {u: pool.submit(page_user, u, *state[u], since) for u in users}
+        for u in users:
+            pages, complete, reason = futures[u].result()
+            _log_paging(u, pages, reason)
+            items = [g for page_items in pages for g in page_items]
+            new_total += store.add_games(u, items, complete, since_ts)
+    return new_total
+
+def build_snapshot(usernames=None, store=None, poll=None, since=None):
+    """
+    Arma el FetchSnapshot del refresh para todas las cuentas de la liga.
+    Con USE_GAME_STORE (o un store explícito) sólo se baja lo nuevo y las páginas
+    salen del store; si no, se descarga todo el historial hasta SINCE en paralelo.
+    `poll` limita a qué cuentas se les consulta la API (None = todas); el resto
+    sale tal cual del store (ver el scheduler de update_cache.py).
+    Con varias ligas, `usernames` es la unión de cuentas y `since` el SINCE más
+    antiguo (ver leagues.py): cada cuenta se descarga una sola vez.
+    """
+    with stage("fetch"):
+        snapshot = _build_snapshot(list(usernames or all_league_usernames()), store, poll, since or SINCE)
+    if DUMP_ENABLED:
+        CAPTURE_LOG.flush(requests=snapshot.requests_made, new_games=snapshot.new_games)
+    return snapshot
+
+def _build_snapshot(usernames, store, poll=None, since=None):
+    before = upstream_request_count()
+    if store is None and not USE_GAME_STORE:
+        pages_by_user = _share_games(fetch_pages_concurrent(usernames, since=since), parse=True)
+        return FetchSnapshot(pages_by_user, upstream_request_count() - before)
+
+    own_store = store is None
+    if own_store:
+        store = GameStore(GAME_STORE_FILE)
+    try:
+        if poll is not None:
+            poll = set(poll)
+        new_games = ingest_users(store, [u for u in usernames if poll is None or u in poll], since=since)
+        since_ts = epoch_utc(since)
+        pages_by_user = _share_games({u: [store.games_for_user(u, since_ts)] for u in usernames})
+    finally:
+        if own_store:
+            store.close()
+    return FetchSnapshot(pages_by_user, upstream_request_count() - before, new_games)
 
 def dedup_by_id(gs):
     seen = set(); out = []
     for g in gs:
-        gid = str(g.get("id") or "")
-        if gid and gid in seen:
+        if g.key in seen:
             continue
-        if gid:
-            seen.add(gid)
+        seen.add(g.key)
         out.append(g)
     return out
 
 def norm_team(s: str) -> str:
     return (s or "").strip().lower()
 
-def compute_team_record_for_user(username_exact: str, team_name: str):
-    # 1) Descargar páginas del usuario PRINCIPAL y de sus ALIAS; luego deduplicar globalmente por id
-    pages_raw = []
-    usernames_to_fetch = [username_exact] + FETCH_ALIASES.get(username_exact, [])
-    for uname in usernames_to_fetch:
-        for p in PAGES:
-            page_items = fetch_page(uname, p)
-            pages_raw += page_items
-            if PRINT_CAPTURE_LIST:
-                for g in page_items:
-                    print(f"    [cap] {uname} p{p} id={g.get('id')}  {g.get('away_full_name','')} @ {g.get('home_full_name','')}  {g.get('display_date','')}")
-    pages_dedup = dedup_by_id(pages_raw)
+# ===== Agregación de la liga en UNA sola pasada =====
+class LeagueAggregator:
+    """
+    Recorre cada juego UNA vez (deduplicado por id entre todas las cuentas y alias),
+    lo clasifica una vez (LEAGUE + fecha + filtro miembro/CPU) y acredita W/L a
+    los DOS equipos en la misma pasada. Los ajustes se aplican después, al armar las filas.
+    Vive entre refreshes (ver aggregate_league): cada refresh sólo acredita los juegos
+    nuevos, con trabajo constante por juego (W/L, carreras, cara a cara, racha).
+    """
 
-    # 2) Filtrar: LEAGUE + fecha + que juegue ese equipo + rival válido
-    considered = []
-    for g in pages_dedup:
-        if (g.get("game_mode") or "").strip().upper() != MODE:
-            continue
-        d = parse_date(g.get("display_date",""))
-        if not d or d < SINCE:
-            continue
+    def __init__(self, league=None):
+        self.league = league or default_league()
+        self.since_ts = epoch_utc(self.league.since)
+        self.rules = load_rules()                        # exclusiones (rules.json)
+        self.signature = _crediting_signature(self.league, self.rules)
+        order = self.league.order
+        self.team_by_norm = {norm_team(t): t for (_u, t) in order}
+        self.seen = set()
+        self.wins = {t: 0 for (_u, t) in order}
+        self.losses = {t: 0 for (_u, t) in order}
+        self.considered = {t: [] for (_u, t) in order}  # juegos contados por equipo
+        self.detail = {t: [] for (_u, t) in order}
+        self.win_ts = {t: [] for (_u, t) in order}      # hora de cada W / L (tabla a una fecha)
+        self.loss_ts = {t: [] for (_u, t) in order}
+        self.stats = TeamStats(t for (_u, t) in order)   # carreras, cara a cara, racha, últimos 10
+        self.games_log = []                               # (epoch, ganador, perdedor, carreras) → Timeline
+
+    def _is_league_game(self, g: Game) -> bool:
+        if g.mode != MODE or g.ts is None or g.ts < self.since_ts:
+            return False
+        if self.rules.excludes(g):
+            return False
+        # Filtro: ambos miembros o CPU + miembro
+        members = self.league.users_norm
+        h_mem = g.home_user in members
+        a_mem = g.away_user in members
+        return (h_mem and a_mem) or (g.home_user == "cpu" and a_mem) or (g.away_user == "cpu" and h_mem)
+
+    def _first_seen(self, g: Game) -> bool:
+        if g.key in self.seen:
+            return False
+        self.seen.add(g.key)
+        return True
+
+    def add_game(self, g: Game) -> bool:
+        """Procesa un juego; devuelve True si contó para la tabla."""
+        return self._first_seen(g) and self._is_league_game(g) and self._credit(g)
+
+    def _credit(self, g: Game) -> bool:
+        home = (g.home_team_key, g.home_user, g.home_team)
+        away = (g.away_team_key, g.away_user, g.away_team)
+        if g.home_result == "W":
+            winner, loser = home, away
+        elif g.away_result == "W":
+            winner, loser = away, home
+        else:
+            return False
+
+        credited = []
+        for (team_key, user, _name), bucket, times in ((winner, self.wins, self.win_ts),
+                                                       (loser, self.losses, self.loss_ts)):
+            # Sólo se acredita el lado que juega un miembro (no la CPU) con un equipo de la liga
+            team = self.team_by_norm.get(team_key)
+            if not team or user == "cpu":
+                credited.append(None)
+                continue
+            bucket[team] += 1
+            times[team].append(g.ts)
+            self.considered[team].append(g)
+            credited.append(team)
+            if PRINT_DETAILS:
+                self.detail[team].append(f"{g.display_date}  {g.away_team} @ {g.home_team} -> ganó {winner[2]}")
+        if credited == [None, None]:
+            return False
+        runs = (g.home_runs, g.away_runs) if winner is home else (g.away_runs, g.home_runs)
+        entry = (g.ts, credited[0], credited[1], *runs)
+        self.stats.add(*entry)
+        self.games_log.append(entry)
+        return True
+
+    def add_games(self, games):
+        """Igual que add_game() juego a juego, pero midiendo cada etapa (dedup/filter/aggregate)."""
+        with stage("dedup"):
+            unique = [g for g in games if self._first_seen(g)]
+        with stage("filter"):
+            league = [g for g in unique if self._is_league_game(g)]
+        with stage("aggregate"):
+            for g in league:
+                self._credit(g)
+        return self
+
+    def team_row(self, username_exact: str, team_name: str):
+        """Fila de la tabla para un equipo, con ajustes de W/L y de puntos + estadísticas extendidas."""
+        row = _team_row(
+            username_exact, team_name,
+            self.wins.get(team_name, 0), self.losses.get(team_name, 0),
+            self.detail.get(team_name, []), self.league,
+        )
+        row.update(self.stats.row_fields(team_name))
+        return row
 
-        home = (g.get("home_full_name") or "").strip()
-        away = (g.get("away_full_name") or "").strip()
-        if norm_team(team_name) not in (norm_team(home), norm_team(away)):
-            continue
+    def timeline(self) -> Timeline:
+        """W/L acumulados por hora de juego + ajustes con vigencia (ver timeline.py)."""
+        lg = self.league
+        return Timeline(lg.order, lg.scheduled, self.win_ts, self.loss_ts,
+                        lg.record_adjustments, lg.point_adjustments, lg.playoff_spots, self.games_log)
 
-        # Filtro: ambos miembros o CPU + miembro
-        home_name_raw = g.get("home_name","")
-        away_name_raw = g.get("away_name","")
-        h_norm = normalize_user_for_compare(home_name_raw)
-        a_norm = normalize_user_for_compare(away_name_raw)
-        h_mem = h_norm in LEAGUE_USERS_NORM
-        a_mem = a_norm in LEAGUE_USERS_NORM
-        if not ( (h_mem and a_mem) or (is_cpu(home_name_raw) and a_mem) or (is_cpu(away_name_raw) and h_mem) ):
-            continue
+_live_aggregators = {}  # league.id -> LeagueAggregator que sigue vivo entre refreshes
 
-        considered.append(g)
+def _crediting_signature(league, rules=None):
+    """Lo que decide qué juegos cuentan y a quién (los ajustes no: se aplican al armar filas)."""
+    rules = rules or load_rules()
+    return (tuple(league.order), frozenset(league.users_norm), league.since, MODE, rules.signature)
 
-    # === Captura/dumps por usuario principal ===
+def aggregate_league(snapshot=None, league=None) -> LeagueAggregator:
+    """
+    Agregado de la liga con los juegos de las cuentas de la liga (principales + alias).
+    Se hace una sola vez por snapshot y liga: tabla y timeline comparten el resultado.
+    El agregador del refresh anterior se reutiliza si la liga cuenta los juegos igual
+    (mismos equipos, miembros, SINCE y exclusiones de rules.json): los juegos ya
+    vistos se saltan por id y sólo los nuevos se acreditan.
+    """
+    league = league or default_league()
+    if snapshot is None:
+        snapshot = build_snapshot(league.all_usernames(), since=league.since)
+    agg = snapshot._aggregates.get(league.id)
+    if agg is None:
+        agg = _live_aggregators.get(league.id)
+        if agg is None or agg.signature != _crediting_signature(league):
+            agg = LeagueAggregator(league)
+        agg.league = league  # ajustes, cupos y nombre al día
+        agg.add_games(snapshot.games_for(league.all_usernames()))
+        snapshot._aggregates[league.id] = _live_aggregators[league.id] = agg
+    return agg
+
+def _capture_report(snapshot, agg: LeagueAggregator, username_exact: str, team_name: str):
+    """Resumen de capturas por usuario principal (modo DEBUG; lo crudo queda en CAPTURE_LOG_FILE)."""
+    if not (PRINT_CAPTURE_SUMMARY or PRINT_CAPTURE_LIST):
+        return
+    pages_raw = []
+    for uname in agg.league.usernames_for(username_exact):
+        for p, page_items in enumerate(snapshot.pages(uname), start=1):
+            pages_raw += page_items
+            if PRINT_CAPTURE_LIST:
+                for g in page_items:
+                    print(f"    [cap] {uname} p{p} id={g.id}  {g.away_team} @ {g.home_team}  {g.display_date}")
+    pages_dedup = dedup_by_id(pages_raw)
+    considered = agg.considered.get(team_name, [])
     if PRINT_CAPTURE_SUMMARY:
         print(f"    [capturas] {team_name} ({username_exact}): raw={len(pages_raw)}  dedup={len(pages_dedup)}  considerados={len(considered)}")
-    if DUMP_ENABLED:
-        base = _safe_name(username_exact)
-        _dump_json(f"{base}_raw.json", pages_raw)
-        _dump_json(f"{base}_dedup.json", pages_dedup)
-        _dump_json(f"{base}_considered.json", considered)
-
-    # 3) Contar W/L
-    wins = losses = 0
-    detail_lines = []
-    for g in considered:
-        home = (g.get("home_full_name") or "").strip()
-        away = (g.get("away_full_name") or "").strip()
-        hr = (g.get("home_display_result") or "").strip().upper()
-        ar = (g.get("away_display_result") or "").strip().upper()
-        dt = g.get("display_date","")
-        if hr == "W":
-            win, lose = home, away
-        elif ar == "W":
-            win, lose = away, home
-        else:
-            continue
 
-        if norm_team(win) == norm_team(team_name):
-            wins += 1
-        elif norm_team(lose) == norm_team(team_name):
-            losses += 1
-
-        if PRINT_DETAILS:
-            detail_lines.append(f"{dt}  {away} @ {home} -> ganó {win}")
-
-    # 4) Ajuste algebraico del equipo (W/L)
-    adj_w, adj_l = TEAM_RECORD_ADJUSTMENTS.get(team_name, (0, 0))
-    wins_adj, losses_adj = wins + adj_w, losses + adj_l
-
-    # 5) Puntos y métricas de tabla
-    scheduled = 13
-    played = max(wins_adj + losses_adj, 0)
-    remaining = max(scheduled - played, 0)
-    points_base = 3 * wins_adj + 2 * losses_adj
-
-    # 6) Ajuste manual de PUNTOS (desconexiones, sanciones, etc.)
-    pts_extra, pts_reason = TEAM_POINT_ADJUSTMENTS.get(team_name, (0, ""))
-    points_final = points_base + pts_extra
-
-    return {
-        "user": username_exact,
-        "team": team_name,
-        "scheduled": scheduled,
-        "played": played,
-        "wins": wins_adj,
-        "losses": losses_adj,
-        "remaining": remaining,
-        "points": points_final,      # << lo que se usa para ordenar y mostrar
-        "points_base": points_base,  # info útil por si quieres comparar
-        "points_extra": pts_extra,   # ej: -1
-        "points_reason": pts_reason, # ej: "Desconexión vs Blue Jays"
-        "detail": detail_lines,
-    }
+def _team_row(username_exact: str, team_name: str, wins: int, losses: int, detail_lines, league=None):
+    """Fila con los ajustes vigentes a hoy (la misma make_row() que la tabla a una fecha)."""
+    league = league or default_league()
+    return make_row(
+        username_exact, team_name, wins, losses, league.scheduled,
+        league.record_adjustments.get(team_name, ()), league.point_adjustments.get(team_name, ()),
+        int(time.time()), detail_lines,
+    )
+
+def compute_team_record_for_user(username_exact: str, team_name: str, snapshot=None, league=None):
+    """Fila de un solo equipo (compatibilidad). Para la tabla completa usar compute_rows()."""
+    league = league or default_league()
+    if snapshot is None:
+        snapshot = build_snapshot(league.all_usernames(), since=league.since)
+    agg = aggregate_league(snapshot, league)
+    _capture_report(snapshot, agg, username_exact, team_name)
+    return agg.team_row(username_exact, team_name)
 
 def main():
     os.makedirs(DUMP_DIR, exist_ok=True)
 
     take = len(LEAGUE_ORDER) if STOP_AFTER_N is None else min(STOP_AFTER_N, len(LEAGUE_ORDER))
     rows = []
-    print(f"Procesando {take} equipos (páginas {PAGES})...\n")
+    print(f"Procesando {take} equipos (paginación adaptativa, tope {MAX_PAGES})...\n")
+    snapshot = build_snapshot()
+    agg = aggregate_league(snapshot)
     for i, (user, team) in enumerate(LEAGUE_ORDER[:take], start=1):
         print(f"[{i}/{take}] {team} ({user})...")
-        row = compute_team_record_for_user(user, team)
+        _capture_report(snapshot, agg, user, team)
+        row = agg.team_row(user, team)
         rows.append(row)
         # Muestra Pts y, si hay ajuste, indícalo
         adj_note = f" (ajuste pts {row['points_extra']}: {row['points_reason']})" if row["points_extra"] else ""
         print(f"  => {row['team']}: {row['wins']}-{row['losses']} (Pts {row['points']}){adj_note}\n")
 
-    # Orden por puntos desc; desempates: W desc, L asc
-    rows.sort(key=lambda r: (-r["points"], -r["wins"], r["losses"]))
+    # Mismo orden y carrera de playoffs que compute_rows() (lo que se publica)
+    sort_rows(rows, agg.stats)
+    annotate_playoff_race(rows, agg.league.playoff_spots, agg.stats)
 
     # Dump standings
     _dump_json("standings.json", rows)
 
-    # Print tabla con posiciones
+    print_standings(rows)
+
+    # Reporte de juegos de HOY (Chile) + dump
+    try:
+        games_today = games_played_today_scl(snapshot)
+    except Exception as e:
+        games_today = []
+        print(f"\n[WARN] games_played_today_scl falló: {e}")
+
+    _dump_json("games_today.json", {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "items": games_today
+    })
+
+    print_games("Juegos jugados HOY (hora Chile)", games_today)
+
+    print(f"\nRequests a la API: {snapshot.requests_made}")
+    print(f"Última actualización: {datetime.now():%Y-%m-%d %H:%M:%S}")
+    if DUMP_ENABLED:
+        print(f"JSON generados en: .\\{DUMP_DIR}\\")
+        print("  - standings.json")
+        print("  - games_today.json")
+        print(f"  - {os.path.basename(CAPTURE_LOG_FILE)} (bitácora de capturas; ver replay.py)")
+
+def print_standings(rows):
+    """Tabla de posiciones en consola (main() y replay.py)."""
     print("\nTabla de posiciones")
     print("Pos | Equipo            | Jugador         | Prog |  JJ |  W |  L | P.Jugar | Pts")
     print("----+-------------------+-----------------+------+-----+----+----+---------+----")
@@ -330,31 +701,14 @@ def main():
             signo = "+" if r["points_extra"] > 0 else ""
             print(f" - {r['team']}: {signo}{r['points_extra']} — {r['points_reason']}")
 
-    # Reporte de juegos de HOY (Chile) + dump
-    try:
-        games_today = games_played_today_scl()
-    except Exception as e:
-        games_today = []
-        print(f"\n[WARN] games_played_today_scl falló: {e}")
-
-    _dump_json("games_today.json", {
-        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "items": games_today
-    })
-
-    print("\nJuegos jugados HOY (hora Chile)")
-    if not games_today:
-        print(" — No hay registros hoy —")
+def print_games(title, games, empty="— No hay registros hoy —"):
+    print(f"\n{title}")
+    if not games:
+        print(f" {empty}")
     else:
-        for i, s in enumerate(games_today, 1):
+        for i, s in enumerate(games, 1):
             print(f"{i:>2}- {s}")
 
-    print(f"\nÚltima actualización: {datetime.now():%Y-%m-%d %H:%M:%S}")
-    print(f"JSON generados en: .\\{DUMP_DIR}\\")
-    print("  - standings.json")
-    print("  - games_today.json")
-    print("  - <usuario>_raw.json / _dedup.json / _considered.json")
-
 if __name__ == "__main__":
     main()
 
@@ -366,115 +720,145 @@ from datetime import datetime
 # ==============================
 # Compatibilidad: filas completas
 # ==============================
-def compute_rows():
+def compute_rows(snapshot=None, league=None):
     """
-    Devuelve la lista completa de filas de la tabla.
-    Intenta detectar una función por-equipo existente.
+    Devuelve la lista completa de filas de la tabla (de `league`; por defecto la del módulo).
+    Una sola pasada de agregación sobre el snapshot (ver LeagueAggregator).
+    Si se entrega un FetchSnapshot se usa tal cual (sin volver a llamar a la API).
     """
-    func = globals().get("compute_team_record_for_user") \
-        or globals().get("compute_team_record") \
-        or globals().get("build_team_row") \
-        or globals().get("team_row_for_user")
-
-    if not func:
-        raise RuntimeError(
-            "No encuentro una función para construir filas por equipo. "
-            "Define compute_team_record_for_user(user, team) o compute_team_record(user, team)."
-        )
-
-    if "LEAGUE_ORDER" not in globals():
-        raise RuntimeError("LEAGUE_ORDER no existe en standings_cascade_points_desc.py")
+    league = league or default_league()
+    if snapshot is None:
+        snapshot = build_snapshot(league.all_usernames(), since=league.since)
+    agg = aggregate_league(snapshot, league)
 
     rows = []
-    for user_exact, team_name in LEAGUE_ORDER:
-        rows.append(func(user_exact, team_name))
-
-    rows.sort(key=lambda r: (-r.get("points", 0), -r.get("wins", 0), r.get("losses", 0)))
+    for user_exact, team_name in league.order:
+        _capture_report(snapshot, agg, user_exact, team_name)
+        rows.append(agg.team_row(user_exact, team_name))
+
+    with stage("sort"):
+        sort_rows(rows, agg.stats)
+    with stage("playoffs"):
+        annotate_playoff_race(rows, league.playoff_spots, agg.stats)
     return rows
 
+def standings_timeline(snapshot=None, league=None) -> Timeline:
+    """Timeline de la liga (tabla a cualquier fecha sin volver a la API)."""
+    league = league or default_league()
+    if snapshot is None:
+        snapshot = build_snapshot(league.all_usernames(), since=league.since)
+    return aggregate_league(snapshot, league).timeline()
+
 
 # -------------------------------
-# Juegos jugados HOY (Chile) - FIX TZ + DEDUP EXTRA
+# Índice de juegos por día (Chile) - FIX TZ + DEDUP EXTRA
 # -------------------------------
-def games_played_today_scl():
-    """
-    Lista juegos del DÍA (America/Santiago) en formato:
-      'Yankees 1 - Brewers 2  - 30-08-2025 - 3:28 pm (hora Chile)'
-    Mejoras:
-      - Deduplicación por id y también por (equipos, runs, pitcher_info).
-      - Si la fecha viene sin tz, se asume UTC y se convierte a America/Santiago.
-      - Se requiere que AMBOS participantes pertenezcan a la liga.
-    """
-    tz_scl = ZoneInfo("America/Santiago")
-    tz_utc = ZoneInfo("UTC")
-    today_local = datetime.now(tz_scl).date()
-
-    # Traer páginas p1 y p2 de todos los usuarios de la liga
-    all_pages = []
-    for username_exact, _team in LEAGUE_ORDER:
-        for p in PAGES:
-            all_pages += fetch_page(username_exact, p)
-
-    # Deduplicadores
-    seen_ids = set()
-    seen_keys = set()  # (home, away, hr, ar, pitcher_info)
-    items = []
-
-    for g in dedup_by_id(all_pages):
-        if (g.get("game_mode") or "").strip().upper() != MODE:
-            continue
-
-        d = parse_date(g.get("display_date", ""))
-        if not d:
-            continue
-
-        # Asumir UTC si es naive, luego convertir a SCL
-        if d.tzinfo is None:
-            d = d.replace(tzinfo=tz_utc)
-        d_local = d.astimezone(tz_scl)
-
-        if d_local.date() != today_local:
-            continue
+def day_of(g: Game, window=None) -> str:
+    """Día del juego según DAY_WINDOW_MODE: "sports" = 06:00–05:59, "calendar" = 00:00–23:59."""
+    return g.day_sports if (window or DAY_WINDOW_MODE) == "sports" else g.day_calendar
 
-        # Ambos jugadores deben pertenecer a la liga
-        home_name_raw = (g.get("home_name") or "")
-        away_name_raw = (g.get("away_name") or "")
-        h_norm = normalize_user_for_compare(home_name_raw)
-        a_norm = normalize_user_for_compare(away_name_raw)
-        if not (h_norm in LEAGUE_USERS_NORM and a_norm in LEAGUE_USERS_NORM):
-            continue
+def current_day(window=None, now=None) -> str:
+    """Día (calendario o deportivo, DAY_WINDOW_MODE por defecto) en curso en Chile, 'YYYY-MM-DD'."""
+    return _current_day(window or DAY_WINDOW_MODE, now)
 
-        # Dedup por id
-        gid = str(g.get("id") or "")
-        if gid and gid in seen_ids:
-            continue
+def format_game_line(g: Game) -> str:
+    """'Yankees 1 - Brewers 2  - 30-08-2025 - 3:28 pm (hora Chile)'"""
+    d_local = datetime.fromtimestamp(g.ts, ZoneInfo("America/Santiago"))
+    try:
+        fecha_hora = d_local.strftime("%d-%m-%Y - %-I:%M %p").lower()
+    except Exception:
+        fecha_hora = d_local.strftime("%d-%m-%Y - %#I:%M %p").lower()
+    return f"{g.home_team} {g.home_runs} - {g.away_team} {g.away_runs}  - {fecha_hora} (hora Chile)"
 
-        home = (g.get("home_full_name") or "").strip()
-        away = (g.get("away_full_name") or "").strip()
-        hr = str(g.get("home_runs") or "0")
-        ar = str(g.get("away_runs") or "0")
-        pitcher_info = (g.get("display_pitcher_info") or "").strip()
+_live_day_indexes = {}  # league.id -> DayIndex que sigue vivo entre refreshes
 
-        # Clave canónica más robusta
-        canon_key = (home, away, hr, ar, pitcher_info)
-        if canon_key in seen_keys:
-            continue
+def _day_index_signature(league, window=None, rules=None):
+    """Lo que decide qué juegos entran al índice y en qué día."""
+    rules = rules or load_rules()
+    return (frozenset(league.users_norm), MODE, window or DAY_WINDOW_MODE, rules.signature)
 
-        # Marcar vistos
-        if gid:
-            seen_ids.add(gid)
-        seen_keys.add(canon_key)
-
-        # Formato de salida
-        try:
-            fecha_hora = d_local.strftime("%d-%m-%Y - %-I:%M %p").lower()
-        except Exception:
-            fecha_hora = d_local.strftime("%d-%m-%Y - %#I:%M %p").lower()
+class DayIndex:
+    """
+    Juegos de liga entre miembros agrupados por día (clave 'YYYY-MM-DD' según
+    DAY_WINDOW_MODE, precalculada en cada Game al ingresar). "hoy", "anoche" o un
+    rango de días son búsquedas en el índice, no otra pasada por todos los juegos.
+    Se mantiene entre refreshes (FetchSnapshot.day_index): cada refresh sólo agrega
+    los juegos nuevos, y sólo los días que cambian se reordenan y re-formatean.
+    Mejoras:
+      - Deduplicación por id y también por (día, equipos, runs, pitcher_info).
+      - Se requiere que AMBOS participantes pertenezcan a la liga.
+      - Los juegos excluidos en rules.json no aparecen.
+    """
 
-        items.append((d_local, f"{home} {hr} - {away} {ar}  - {fecha_hora} (hora Chile)"))
+    def __init__(self, games=(), league=None, window=None):
+        self.window = window or DAY_WINDOW_MODE
+        self.league = league or default_league()
+        self.rules = load_rules()
+        self.signature = _day_index_signature(self.league, self.window, self.rules)
+        self.seen = set()        # ids ya procesados
+        self._canon = set()      # (día, home, away, hr, ar, pitcher_info)
+        self.by_day = {}
+        self._lines = {}
+        self.add_games(games)
+
+    def add_games(self, games):
+        """Agrega juegos (los ya vistos por id se saltan)."""
+        members = self.league.users_norm
+        touched = set()
+        for g in games:
+            if g.key in self.seen:
+                continue
+            self.seen.add(g.key)
+            if g.mode != MODE or g.ts is None:
+                continue
+            # Ambos jugadores deben pertenecer a la liga
+            if not (g.home_user in members and g.away_user in members):
+                continue
+            if self.rules.excludes(g):
+                continue
+            day = day_of(g, self.window)
+            # Clave canónica más robusta
+            canon_key = (day, g.home_team, g.away_team, g.home_runs, g.away_runs, g.pitcher)
+            if canon_key in self._canon:
+                continue
+            self._canon.add(canon_key)
+            self.by_day.setdefault(day, []).append(g)
+            touched.add(day)
+        for day in touched:
+            self.by_day[day].sort(key=lambda g: g.ts)
+            self._lines.pop(day, None)
+        return self
+
+    def games(self, day: str):
+        return self.by_day.get(day, [])
+
+    def lines(self, day: str):
+        """Juegos de un día ya formateados (format_game_line), en orden de hora."""
+        if day not in self._lines:
+            self._lines[day] = [format_game_line(g) for g in self.games(day)]
+        return self._lines[day]
+
+    def days(self, first=None, last=None):
+        """Días con juegos entre first y last (inclusive, 'YYYY-MM-DD'), en orden."""
+        return [d for d in sorted(self.by_day) if (not first or d >= first) and (not last or d <= last)]
+
+def day_index(snapshot=None, league=None) -> DayIndex:
+    league = league or default_league()
+    if snapshot is None:
+        snapshot = build_snapshot(league.all_usernames(), since=league.since)
+    return snapshot.day_index(league)
 
-    items.sort(key=lambda x: x[0])
-    return [s for _, s in items]
+# -------------------------------
+# Juegos jugados HOY (Chile)
+# -------------------------------
+def games_played_today_scl(snapshot=None, league=None):
+    """
+    Lista juegos del DÍA (America/Santiago; día deportivo 06:00–05:59 si
+    DAY_WINDOW_MODE = "sports") en formato:
+      'Yankees 1 - Brewers 2  - 30-08-2025 - 3:28 pm (hora Chile)'
+    Si se entrega un FetchSnapshot se reutiliza su índice por día (ver DayIndex).
+    """
+    return list(day_index(snapshot, league).lines(current_day()))
 
 
 # ====== FIN DEL BLOQUE ======
@@ -0,0 +1,92 @@
+# static_page.py
+# Página principal pre-renderizada: el updater arma UNA vez por snapshot el HTML completo
+# (tabla + juegos de hoy) con el mismo templates/index.html que usa Flask, más sus variantes
+# .gz / .br. app.py la sirve tal cual (ETag + Last-Modified): la primera pintura es una sola
+# request y el costo por visita no depende de cuántas haya.
+# - Escritura atómica (snapshots.atomic_write_bytes): primero las variantes, al final el .html.
+#   app.py valida que las variantes correspondan al .html que lee.
+
+import gzip, os
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+import snapshots
+
+try:
+    import brotli  # opcional: pip install brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+PAGE_TEMPLATE = "index.html"
+
+_env = None
+
+
+def _template():
+    global _env
+    if _env is None:
+        _env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=select_autoescape(["html"]))
+    return _env.get_template(PAGE_TEMPLATE)  # jinja2 recarga sola si cambia el archivo
+
+
+def game_parts(s):
+    """
+    Igual que parseGameString() de index.html:
+    'Mets 3 - Mariners 0 - 07-09-2025 - 6:30 pm (hora Chile)' → equipos, marcador y hora.
+    """
+    if not isinstance(s, str):
+        return {"raw": str(s)}
+    parts = " ".join(s.split()).split(" - ")
+    if len(parts) < 4:
+        return {"raw": s}
+    home, _, home_score = parts[0].rpartition(" ")
+    away, _, away_score = parts[1].rpartition(" ")
+    if not home:
+        home, home_score = home_score, ""
+    if not away:
+        away, away_score = away_score, ""
+    return {
+        "home_team": home, "home_score": home_score,
+        "away_team": away, "away_score": away_score,
+        "ended_at_local": f"{parts[2]} - {parts[3]}",
+    }
+
+
+def render_page(payload) -> bytes:
+    """HTML de la página con el snapshot publicado (payload con version/hash)."""
+    page = {
+        "standings": payload.get("standings", []),
+        "games_today": [game_parts(g) for g in payload.get("games_today", [])],
+        "last_updated": payload.get("last_updated"),
+        "meta": {"version": payload.get("version"), "hash": payload.get("hash")},
+    }
+    return _template().render(page=page).encode("utf-8")
+
+
+def compress_variants(body: bytes):
+    """{"gzip": ..., "br": ...} (br sólo si está instalado brotli)."""
+    variants = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body)
+    return variants
+
+
+VARIANT_SUFFIX = {"gzip": ".gz", "br": ".br"}
+
+
+def publish_page(path, payload):
+    """Escribe path (+ path.gz / path.br) de forma atómica. Devuelve el HTML."""
+    body = render_page(payload)
+    variants = compress_variants(body)
+    for enc, suffix in VARIANT_SUFFIX.items():
+        if enc in variants:
+            snapshots.atomic_write_bytes(path + suffix, variants[enc])
+        else:
+            try:
+                os.remove(path + suffix)  # una .br vieja ya no corresponde
+            except OSError:
+                pass
+    snapshots.atomic_write_bytes(path, body)
+    return body
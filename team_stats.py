@@ -0,0 +1,173 @@
+# team_stats.py
+# Estadísticas extendidas por equipo, acumuladas juego a juego (trabajo constante por juego):
+# - carreras a favor / en contra y diferencia,
+# - cara a cara (W-L de cada equipo contra cada rival de la liga),
+# - racha y últimos 10 (resultados guardados en orden de hora de juego).
+# Lo alimenta LeagueAggregator (al ingresar cada juego). Para la tabla a una fecha
+# (Timeline) está TeamStatsHistory: lo mismo en arreglos acumulados que se bisectan.
+# Sin dependencias.
+
+from bisect import bisect_right, insort
+
+
+def _runs(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+class TeamStats:
+    def __init__(self, teams):
+        teams = list(teams)
+        self.teams = teams
+        self.runs_for = dict.fromkeys(teams, 0)
+        self.runs_against = dict.fromkeys(teams, 0)
+        self.h2h = {t: {} for t in teams}        # equipo -> {rival: [W, L]}
+        self.results = {t: [] for t in teams}    # equipo -> [(epoch, "W"/"L")] por hora
+
+    def add(self, ts, winner, loser, winner_runs, loser_runs):
+        """
+        Un juego acreditado. winner/loser: equipo de la liga, o None para el lado que
+        no cuenta (CPU / equipo fuera de la liga).
+        """
+        wr, lr = _runs(winner_runs), _runs(loser_runs)
+        if winner in self.results:
+            self.runs_for[winner] += wr
+            self.runs_against[winner] += lr
+            insort(self.results[winner], (ts or 0, "W"))  # casi siempre al final: llegan en orden
+        if loser in self.results:
+            self.runs_for[loser] += lr
+            self.runs_against[loser] += wr
+            insort(self.results[loser], (ts or 0, "L"))
+        if winner in self.h2h and loser in self.h2h and winner != loser:
+            self.h2h[winner].setdefault(loser, [0, 0])[0] += 1
+            self.h2h[loser].setdefault(winner, [0, 0])[1] += 1
+
+    def streak(self, team) -> str:
+        """'W3' / 'L1' ('' sin juegos)."""
+        res = self.results.get(team) or []
+        if not res:
+            return ""
+        last = res[-1][1]
+        n = 0
+        for _ts, r in reversed(res):
+            if r != last:
+                break
+            n += 1
+        return f"{last}{n}"
+
+    def last10(self, team) -> str:
+        res = (self.results.get(team) or [])[-10:]
+        wins = sum(1 for _ts, r in res if r == "W")
+        return f"{wins}-{len(res) - wins}"
+
+    def row_fields(self, team):
+        """Campos extra de la fila de la tabla."""
+        rf, ra = self.runs_for.get(team, 0), self.runs_against.get(team, 0)
+        return {
+            "runs_for": rf,
+            "runs_against": ra,
+            "run_diff": rf - ra,
+            "streak": self.streak(team),
+            "last10": self.last10(team),
+        }
+
+    def h2h_net(self, team, opponents) -> int:
+        """W - L de `team` contra los equipos de `opponents` (desempate entre empatados)."""
+        rec = self.h2h.get(team, {})
+        return sum(rec.get(o, (0, 0))[0] - rec.get(o, (0, 0))[1] for o in opponents if o != team)
+
+    def played(self, team, opponent) -> int:
+        """Juegos ya jugados entre dos equipos de la liga (cruces restantes, ver playoffs.py)."""
+        w, l = self.h2h.get(team, {}).get(opponent, (0, 0))
+        return w + l
+
+    def matrix(self):
+        """{"teams": [...], "matrix": [[[W, L] | None, ...], ...]} (fila = equipo, columna = rival)."""
+        return {
+            "teams": self.teams,
+            "matrix": [[None if o == t else list(self.h2h[t].get(o, (0, 0))) for o in self.teams]
+                       for t in self.teams],
+        }
+
+
+_NO_GAMES = ([], [0], [0], [0], [], [])
+
+
+class TeamStatsHistory:
+    """
+    Las mismas estadísticas que TeamStats, consultables a cualquier fecha sin volver a
+    recorrer los juegos: por equipo, horas de sus juegos y acumulados (carreras a favor /
+    en contra, victorias, largo de la racha); por par, horas de cada W de uno sobre el otro.
+    Se arma una vez (O(juegos)); cada consulta bisecta: O(log juegos) por equipo o par.
+    """
+
+    def __init__(self, teams, games):
+        """games: [(epoch, ganador|None, perdedor|None, carreras ganador, carreras perdedor)]."""
+        self.teams = list(teams)
+        entries = {t: [] for t in self.teams}   # equipo -> [(epoch, "W"/"L", a favor, en contra)]
+        self._beat = {}                         # (ganador, perdedor) -> [epoch, ...]
+        for ts, winner, loser, winner_runs, loser_runs in games:
+            ts, wr, lr = ts or 0, _runs(winner_runs), _runs(loser_runs)
+            if winner in entries:
+                entries[winner].append((ts, "W", wr, lr))
+            if loser in entries:
+                entries[loser].append((ts, "L", lr, wr))
+            if winner in entries and loser in entries and winner != loser:
+                self._beat.setdefault((winner, loser), []).append(ts)
+        for times in self._beat.values():
+            times.sort()
+        # equipo -> (horas, carreras a favor acum., en contra acum., W acum., largo de racha, resultados)
+        self._teams = {}
+        for team, games_of_team in entries.items():
+            games_of_team.sort(key=lambda e: (e[0], e[1]))  # mismo orden que TeamStats.results
+            times, rf, ra, wins, streak, results = [], [0], [0], [0], [], []
+            for ts, res, runs_for, runs_against in games_of_team:
+                times.append(ts)
+                rf.append(rf[-1] + runs_for)
+                ra.append(ra[-1] + runs_against)
+                wins.append(wins[-1] + (res == "W"))
+                streak.append(streak[-1] + 1 if results and results[-1] == res else 1)
+                results.append(res)
+            self._teams[team] = (times, rf, ra, wins, streak, results)
+
+    def as_of(self, as_of):
+        """Vista con la interfaz de TeamStats (row_fields, h2h_net, matrix) hasta `as_of` inclusive."""
+        return TeamStatsView(self, as_of)
+
+
+class TeamStatsView:
+    def __init__(self, history, as_of):
+        self._history = history
+        self._as_of = as_of
+        self.teams = history.teams
+
+    def _beat(self, winner, loser) -> int:
+        return bisect_right(self._history._beat.get((winner, loser), ()), self._as_of)
+
+    def row_fields(self, team):
+        times, rf, ra, wins, streak, results = self._history._teams.get(team, _NO_GAMES)
+        n = bisect_right(times, self._as_of)
+        last = min(n, 10)
+        last_wins = wins[n] - wins[n - last]
+        return {
+            "runs_for": rf[n],
+            "runs_against": ra[n],
+            "run_diff": rf[n] - ra[n],
+            "streak": f"{results[n - 1]}{streak[n - 1]}" if n else "",
+            "last10": f"{last_wins}-{last - last_wins}",
+        }
+
+    def h2h_net(self, team, opponents) -> int:
+        return sum(self._beat(team, o) - self._beat(o, team) for o in opponents if o != team)
+
+    def played(self, team, opponent) -> int:
+        return self._beat(team, opponent) + self._beat(opponent, team)
+
+    def matrix(self):
+        return {
+            "teams": self.teams,
+            "matrix": [[None if o == t else [self._beat(t, o), self._beat(o, t)] for o in self.teams]
+                       for t in self.teams],
+        }
@@ -0,0 +1,110 @@
+# tests/test_playoffs.py
+# Fuerza bruta contra playoffs.annotate_playoff_race: en ligas chicas al azar se recorren
+# TODOS los resultados posibles de los juegos restantes y se verifica que lo marcado sea
+# cierto en cada uno ("clinched" → siempre adentro, "eliminated" → nunca adentro,
+# magic_number m → adentro siempre que gane al menos m de los suyos).
+# - Calendario cualquiera (juegos entre equipos de la liga y contra la CPU), sin cara a cara.
+# - Todos contra todos a una vuelta, con los cruces restantes deducidos del cara a cara.
+#
+#   python -m pytest -q tests      (o: python -m unittest discover tests)
+
+import itertools, os, random, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playoffs import annotate_playoff_race, _remaining_pairs
+from team_stats import TeamStats
+
+CPU = None
+
+
+def _row(team, wins, losses, remaining, scheduled):
+    return {"team": team, "wins": wins, "losses": losses, "points": 3 * wins + 2 * losses,
+            "remaining": remaining, "scheduled": scheduled}
+
+
+def _final_key(row, won, lost):
+    return (row["points"] + 3 * won + 2 * lost, row["wins"] + won, -(row["losses"] + lost))
+
+
+def _check(testcase, rows, games, spots, stats=None):
+    """games: [(equipo, equipo | CPU)] restantes. Compara lo anotado con todos los resultados."""
+    annotate_playoff_race(rows, spots, stats)
+    by_team = {r["team"]: r for r in rows}
+    ever_in = {t: False for t in by_team}
+    ever_out = {t: False for t in by_team}
+    for outcome in itertools.product((0, 1), repeat=len(games)):
+        won = dict.fromkeys(by_team, 0)
+        lost = dict.fromkeys(by_team, 0)
+        for (a, b), a_loses in zip(games, outcome):
+            winner, loser = (b, a) if a_loses else (a, b)
+            if winner is not CPU:
+                won[winner] += 1
+            if loser is not CPU:
+                lost[loser] += 1
+        keys = {t: _final_key(by_team[t], won[t], lost[t]) for t in by_team}
+        for t, row in by_team.items():
+            inside = sum(1 for o in by_team if o != t and keys[o] >= keys[t]) < spots
+            ever_in[t] |= inside
+            ever_out[t] |= not inside
+            magic = row["magic_number"]
+            if magic is not None and won[t] >= magic:
+                testcase.assertTrue(inside, f"{t}: número mágico {magic} y queda fuera ({rows}, {games})")
+    for t, row in by_team.items():
+        if row["clinched"]:
+            testcase.assertFalse(ever_out[t], f"{t}: clasificado y puede quedar fuera ({rows}, {games})")
+        if row["eliminated"]:
+            testcase.assertFalse(ever_in[t], f"{t}: eliminado y puede entrar ({rows}, {games})")
+
+
+class PlayoffRaceBruteForce(unittest.TestCase):
+    def test_any_schedule_with_cpu_games(self):
+        rng = random.Random(20)
+        for _ in range(400):
+            teams = [f"T{i}" for i in range(rng.randint(3, 5))]
+            games = []
+            for _g in range(rng.randint(0, 9)):
+                a = rng.choice(teams)
+                b = rng.choice([CPU, CPU] + [t for t in teams if t != a])
+                games.append((a, b))
+            rows = []
+            for t in teams:
+                remaining = sum(1 for g in games if t in g)
+                wins, losses = rng.randint(0, 4), rng.randint(0, 4)
+                rows.append(_row(t, wins, losses, remaining, wins + losses + remaining))
+            _check(self, rows, games, rng.randint(1, len(teams) - 1))
+
+    def test_round_robin_from_head_to_head(self):
+        rng = random.Random(25)
+        pairing_cases = 0
+        for _ in range(400):
+            teams = [f"T{i}" for i in range(rng.randint(3, 5))]
+            stats = TeamStats(teams)
+            record = {t: [0, 0] for t in teams}
+            pending = []
+            for a, b in itertools.combinations(teams, 2):
+                if rng.random() < 0.55:
+                    winner, loser = (a, b) if rng.random() < 0.5 else (b, a)
+                    stats.add(0, winner, loser, 1, 0)
+                    record[winner][0] += 1
+                    record[loser][1] += 1
+                else:
+                    pending.append((a, b))
+            rows = [_row(t, w, l, sum(1 for g in pending if t in g), len(teams) - 1)
+                    for t, (w, l) in record.items()]
+            self.assertIsNotNone(_remaining_pairs(rows, stats))
+            pairing_cases += 1
+            _check(self, rows, pending, rng.randint(1, len(teams) - 1), stats)
+        self.assertEqual(pairing_cases, 400)
+
+    def test_cpu_game_played_disables_pairings(self):
+        # T0 jugó contra la CPU en vez de contra T2: lo que le queda ya no sale del cara a cara
+        stats = TeamStats(["T0", "T1", "T2"])
+        stats.add(0, "T0", "T1", 1, 0)
+        stats.add(0, "T0", None, 1, 0)
+        rows = [_row("T0", 2, 0, 0, 2), _row("T1", 0, 1, 1, 2), _row("T2", 0, 0, 2, 2)]
+        self.assertIsNone(_remaining_pairs(rows, stats))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+# tests/test_team_stats.py
+# TeamStatsHistory (tabla a una fecha, por bisección) contra TeamStats alimentado sólo con
+# los juegos hasta esa fecha: en ligas chicas al azar (juegos contra la CPU, horas repetidas
+# o faltantes, carreras no numéricas) todas las consultas deben dar lo mismo.
+#
+#   python -m pytest -q tests      (o: python -m unittest discover tests)
+
+import os, random, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from team_stats import TeamStats, TeamStatsHistory
+
+CPU = None
+
+
+def _random_games(rng, teams):
+    """[(epoch | None, ganador, perdedor, carreras ganador, carreras perdedor)]."""
+    games = []
+    for _ in range(rng.randint(0, 60)):
+        winner, loser = rng.sample(teams + [CPU], 2)
+        games.append((rng.choice([None, rng.randint(0, 30)]), winner, loser,
+                      str(rng.randint(0, 9)), rng.choice(["x", str(rng.randint(0, 9))])))
+    return games
+
+
+class TeamStatsHistoryMatchesReplay(unittest.TestCase):
+    def test_as_of_matches_replay(self):
+        for seed in range(300):
+            rng = random.Random(seed)
+            teams = [f"T{i}" for i in range(rng.randint(2, 8))]
+            games = _random_games(rng, teams)
+            history = TeamStatsHistory(teams, rng.sample(games, len(games)))
+            for as_of in range(-1, 32):
+                replay = TeamStats(teams)
+                for g in sorted(games, key=lambda g: g[0] or 0):
+                    if (g[0] or 0) <= as_of:
+                        replay.add(*g)
+                view = history.as_of(as_of)
+                where = f"(semilla {seed}, as_of {as_of})"
+                for t in teams:
+                    self.assertEqual(view.row_fields(t), replay.row_fields(t), f"{t} {where}")
+                    self.assertEqual(view.h2h_net(t, teams), replay.h2h_net(t, teams), f"{t} {where}")
+                    for o in teams:
+                        self.assertEqual(view.played(t, o), replay.played(t, o), f"{t}-{o} {where}")
+                self.assertEqual(view.matrix(), replay.matrix(), where)
+
+
+if __name__ == "__main__":
+    unittest.main()
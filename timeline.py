@@ -0,0 +1,191 @@
+# timeline.py
+# Tabla "a una fecha" (time-travel) sin llamar a la API.
+# - Por equipo, las horas (epoch UTC) de cada W y cada L acreditada, ordenadas:
+#   W/L a cualquier instante = bisect → O(equipos × log juegos).
+# - Los ajustes manuales (record_adjustments / point_adjustments de rules.json) pueden
+#   traer fecha de vigencia; sin fecha aplican siempre.
+# - make_row() es el único lugar donde se arma una fila de la tabla (lo usa también
+#   standings_*.compute_rows), así la tabla de hoy y la de cualquier fecha cuadran.
+# - Cada tabla trae clasificados/eliminados/número mágico a esa fecha (playoffs.py).
+# - También guarda los juegos acreditados (hora, ganador, perdedor, carreras): carreras,
+#   racha, últimos 10 y cara a cara a cualquier fecha (team_stats.py), y los desempates.
+# Sin dependencias: app.py lo importa para /api/standings?as_of=.
+
+import time
+from bisect import bisect_right
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from playoffs import PLAYOFF_SPOTS, annotate_playoff_race
+from team_stats import TeamStatsHistory
+
+SCL = ZoneInfo("America/Santiago")
+
+
+def parse_local_time(value, end_of_day=False):
+    """
+    'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM[:SS]' (también con 'T') en hora Chile → epoch.
+    Con sólo la fecha: 00:00 de ese día, o 23:59:59 si end_of_day.
+    """
+    value = str(value).strip()
+    d = datetime.fromisoformat(value)
+    if len(value) <= 10 and end_of_day:
+        d = d.replace(hour=23, minute=59, second=59)
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=SCL)
+    return int(d.timestamp())
+
+
+def _entries(value, size, numeric):
+    """
+    Un ajuste (tupla) o una lista de ajustes → lista de tuplas de `size` (+ vigencia).
+    Los primeros `numeric` campos deben ser números; si no, o si la vigencia no es una
+    fecha válida, ValueError (así un archivo mal escrito se rechaza al cargarlo).
+    """
+    if not value:
+        return []
+    if not isinstance(value, (list, tuple)):
+        raise ValueError(f"ajuste inválido: {value!r}")
+    if not isinstance(value[0], (list, tuple)):
+        value = [value]
+    out = []
+    for e in value:
+        e = tuple(e)
+        if len(e) < size or not all(isinstance(x, (int, float)) for x in e[:numeric]):
+            raise ValueError(f"ajuste inválido: {list(e)}")
+        eff = e[size] if len(e) > size else None
+        out.append(e[:size] + (parse_local_time(eff) if isinstance(eff, str) else eff,))
+    return out
+
+
+def normalize_record_adjustments(adjustments):
+    """{"Equipo": (dW, dL[, "vigente desde"]) | [..varios..]} → {"Equipo": [(dW, dL, epoch|None)]}"""
+    return {t: _entries(v, 2, 2) for t, v in (adjustments or {}).items()}
+
+
+def normalize_point_adjustments(adjustments):
+    """{"Equipo": (pts, "razón"[, "vigente desde"]) | [..varios..]} → {"Equipo": [(pts, razón, epoch|None)]}"""
+    return {t: _entries(v, 2, 1) for t, v in (adjustments or {}).items()}
+
+
+def _in_effect(eff, as_of):
+    return eff is None or as_of is None or eff <= as_of
+
+
+def make_row(username_exact, team_name, wins, losses, scheduled, record_adj=(), point_adj=(),
+             as_of=None, detail_lines=None):
+    """Fila de la tabla con los ajustes vigentes a `as_of` (epoch; None = todos)."""
+    # 4) Ajuste algebraico del equipo (W/L)
+    adj_w = sum(w for w, _l, eff in record_adj if _in_effect(eff, as_of))
+    adj_l = sum(l for _w, l, eff in record_adj if _in_effect(eff, as_of))
+    wins_adj, losses_adj = wins + adj_w, losses + adj_l
+
+    # 5) Puntos y métricas de tabla
+    played = max(wins_adj + losses_adj, 0)
+    remaining = max(scheduled - played, 0)
+    points_base = 3 * wins_adj + 2 * losses_adj
+
+    # 6) Ajuste manual de PUNTOS (desconexiones, sanciones, etc.)
+    active = [(p, r) for p, r, eff in point_adj if _in_effect(eff, as_of)]
+    pts_extra = sum(p for p, _r in active)
+    pts_reason = "; ".join(r for _p, r in active if r)
+    points_final = points_base + pts_extra
+
+    return {
+        "user": username_exact,
+        "team": team_name,
+        "scheduled": scheduled,
+        "played": played,
+        "wins": wins_adj,
+        "losses": losses_adj,
+        "remaining": remaining,
+        "points": points_final,      # << lo que se usa para ordenar y mostrar
+        "points_base": points_base,  # info útil por si quieres comparar
+        "points_extra": pts_extra,   # ej: -1
+        "points_reason": pts_reason, # ej: "Desconexión vs Blue Jays"
+        "detail": detail_lines or [],
+    }
+
+
+def _base_key(r):
+    return (-r.get("points", 0), -r.get("wins", 0), r.get("losses", 0))
+
+
+def sort_rows(rows, stats=None):
+    """
+    Orden por puntos desc; desempates: W desc, L asc.
+    Con `stats` (TeamStats), si siguen empatados: cara a cara entre los empatados
+    (W - L contra ellos) y luego diferencia de carreras.
+    """
+    rows.sort(key=_base_key)
+    if stats is None:
+        return rows
+    i = 0
+    while i < len(rows):
+        j = i + 1
+        while j < len(rows) and _base_key(rows[j]) == _base_key(rows[i]):
+            j += 1
+        if j - i > 1:
+            tied = [r["team"] for r in rows[i:j]]
+            rows[i:j] = sorted(rows[i:j], key=lambda r: (-stats.h2h_net(r["team"], tied),
+                                                        -r.get("run_diff", 0)))
+        i = j
+    return rows
+
+
+class Timeline:
+    def __init__(self, order, scheduled, win_ts, loss_ts, record_adjustments=None, point_adjustments=None,
+                 playoff_spots=PLAYOFF_SPOTS, games=None):
+        self.order = [tuple(x) for x in order]                  # [(username, equipo)]
+        self.scheduled = scheduled
+        self.win_ts = {t: sorted(v) for t, v in win_ts.items()}  # equipo -> [epoch, ...]
+        self.loss_ts = {t: sorted(v) for t, v in loss_ts.items()}
+        self.record_adjustments = record_adjustments or {}      # normalizados (ver arriba)
+        self.point_adjustments = point_adjustments or {}
+        self.playoff_spots = playoff_spots
+        # [(epoch, ganador|None, perdedor|None, carreras ganador, carreras perdedor)] por hora
+        self.games = sorted((tuple(g) for g in games or ()), key=lambda g: g[0] or 0)
+        self._stats = TeamStatsHistory((t for _u, t in self.order), self.games)
+
+    def stats_as_of(self, as_of=None):
+        """Carreras, racha, últimos 10 y cara a cara con los juegos hasta `as_of` (vista que bisecta)."""
+        as_of = int(time.time()) if as_of is None else as_of
+        return self._stats.as_of(as_of)
+
+    def rows_as_of(self, as_of=None):
+        """Tabla ordenada con los juegos y ajustes hasta `as_of` (epoch, inclusive; None = ahora)."""
+        as_of = int(time.time()) if as_of is None else as_of
+        stats = self.stats_as_of(as_of)
+        rows = []
+        for user, team in self.order:
+            wins = bisect_right(self.win_ts.get(team, []), as_of)
+            losses = bisect_right(self.loss_ts.get(team, []), as_of)
+            row = make_row(user, team, wins, losses, self.scheduled,
+                           self.record_adjustments.get(team, ()), self.point_adjustments.get(team, ()),
+                           as_of)
+            del row["detail"]
+            row.update(stats.row_fields(team))
+            rows.append(row)
+        return annotate_playoff_race(sort_rows(rows, stats), self.playoff_spots, stats)
+
+    def to_dict(self):
+        return {
+            "order": self.order,
+            "scheduled": self.scheduled,
+            "win_ts": self.win_ts,
+            "loss_ts": self.loss_ts,
+            "record_adjustments": self.record_adjustments,
+            "point_adjustments": self.point_adjustments,
+            "playoff_spots": self.playoff_spots,
+            "games": self.games,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["order"], data["scheduled"], data["win_ts"], data["loss_ts"],
+            {t: [tuple(e) for e in v] for t, v in data.get("record_adjustments", {}).items()},
+            {t: [tuple(e) for e in v] for t, v in data.get("point_adjustments", {}).items()},
+            data.get("playoff_spots", PLAYOFF_SPOTS),
+            data.get("games"),
+        )
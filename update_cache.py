@@ -1,7 +1,7 @@
 # update_cache.py
 # Genera el cache usando compute_rows() y games_played_today_scl() del módulo standings_*
-import json, os, sys, time
-from datetime import datetime
+import os, sys, time, math
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 # --- Import robusto del módulo principal ---
@@ -9,55 +9,69 @@ try:
     import standings_cascade_points_desc as standings
 except Exception:
     import standings_cascade_points as standings  # fallback si el nombre no tiene _desc
+import snapshots
+import static_page
+import metrics
+import leagues
+from metrics import REGISTRY
+from game_store import GameStore
+from game_record import SPORTS_DAY_START_HOUR
+from refresh_lock import RefreshLock
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CACHE_FILE = os.path.join(BASE_DIR, "standings_cache.json")
+REFRESH_METRICS_FILE = os.path.join(BASE_DIR, "refresh_metrics.json")  # lo expone app.py en /metrics
+GAMES_INDEX_FILE = os.path.join(BASE_DIR, "games_index.json")  # juegos por día → /api/games
+TIMELINE_FILE = os.path.join(BASE_DIR, "standings_timeline.json")  # W/L por hora → /api/standings?as_of=
+STATIC_PAGE_FILE = os.path.join(BASE_DIR, "standings.html")  # página "/" pre-renderizada (+ .gz/.br)
+# Un solo refresher a la vez entre procesos (este bucle o el hilo embebido en app.py)
+REFRESH_LOCK_FILE = os.getenv("REFRESH_LOCK_FILE", os.path.join(BASE_DIR, "refresh.lock"))
+REFRESH_LOCK_RETRY_SECONDS = 30
 SCL = ZoneInfo("America/Santiago")
+UPDATE_INTERVAL_SECONDS = int(os.getenv("UPDATE_INTERVAL_SECONDS", "300"))  # 5 min
 
-# --- Lista de exclusiones manuales ---
-# Caso 1: excluir por string exacto (cuando games_today es lista de strings)
-EXCLUDE_STRINGS = {
-    "Yankees 0 - 0 Mets - 08-09-2025 - 9:40 pm (hora Chile)",
-}
-
-# Caso 2: excluir por reglas (cuando games_today es lista de objetos)
-EXCLUDE_RULES = [
-    {
-        "home_team": "Yankees",
-        "away_team": "Mets",
-        "home_score": 0,
-        "away_score": 0,
-        "ended_at_local_contains": "08-09-2025 - 9:40"
-    }
+# --- Scheduler de sondeo por actividad (ver PollScheduler) ---
+POLL_SCHEDULER = os.getenv("POLL_SCHEDULER", "1") == "1"   # 0 = bucle fijo de antes
+POLL_TICK_SECONDS = int(os.getenv("POLL_TICK_SECONDS", "30"))
+# (antigüedad máxima del último juego de liga en segundos, intervalo de sondeo);
+# None = jugó en el día deportivo actual. Sin juegos de liga → POLL_IDLE_SECONDS.
+POLL_TIERS = [
+    (2 * 3600, 60),        # jugando / recién jugó
+    (None, 180),           # jugó hoy (día deportivo)
+    (3 * 86400, 600),      # activo en los últimos días
 ]
+POLL_IDLE_SECONDS = 1800
 
-def _should_exclude_game(g):
-    # Si es string: comparación exacta contra EXCLUDE_STRINGS
-    if isinstance(g, str):
-        return g.strip() in EXCLUDE_STRINGS
-
-    # Si es objeto: coteja campos si existen
-    if isinstance(g, dict):
-        for rule in EXCLUDE_RULES:
-            ok = True
-            for k, v in rule.items():
-                if k == "ended_at_local_contains":
-                    if v not in (g.get("ended_at_local") or ""):
-                        ok = False
-                        break
-                else:
-                    if g.get(k) != v:
-                        ok = False
-                        break
-            if ok:
-                return True
-    return False
-
-
-def update_data_cache():
+REGISTRY.gauge("strike_poll_users_polled", "Cuentas consultadas a la API en el último tick del scheduler")
+REGISTRY.gauge("strike_poll_users_by_interval", "Cuentas por intervalo de sondeo asignado (segundos)")
+
+# Exclusiones manuales de juegos y ajustes: rules.json (ver rules.py). Se aplican al
+# ingresar cada juego (tabla, timeline y juegos por día) y se recargan en caliente.
+
+
+def update_data_cache(poll=None, force_publish=True):
+    """
+    Refresh del cache. `poll` = cuentas a consultar en la API (None = todas); la tabla
+    se arma igual con TODAS las cuentas desde el store. Sin `force_publish`, si no
+    entró ningún juego nuevo no se publica un snapshot nuevo.
+    """
     ts = datetime.now(SCL).strftime('%Y-%m-%d %H:%M:%S')
-    print(f"[{ts}] Iniciando actualización del cache...")
+    print(f"[{ts}] Iniciando actualización del cache"
+          + (f" ({len(poll)} cuentas)..." if poll is not None else "..."))
+    t0 = time.perf_counter()
+    ok = _update_data_cache(ts, poll, force_publish)
+    REGISTRY.observe("strike_refresh_seconds", time.perf_counter() - t0)
+    REGISTRY.inc("strike_refresh_total", result="ok" if ok else "error")
+    if ok:
+        REGISTRY.set("strike_refresh_last_success_timestamp", time.time())
+    try:
+        metrics.dump(REFRESH_METRICS_FILE)
+    except OSError as e:
+        print(f"[WARN] no se pudieron guardar las métricas: {e}")
+    return ok
 
+
+def _update_data_cache(ts, poll=None, force_publish=True):
     try:
         # Validaciones mínimas para que el error sea claro si faltara algo
         if not hasattr(standings, "compute_rows"):
@@ -65,43 +79,193 @@ def update_data_cache():
         if not hasattr(standings, "games_played_today_scl"):
             raise AttributeError("El módulo no define games_played_today_scl()")
 
-        # 1) Tabla
-        rows = standings.compute_rows()
+        # 0) Descargar UNA sola vez (principales + alias de TODAS las ligas) para todos los reportes
+        all_leagues = leagues.load_leagues()
+        snapshot = leagues.build_shared_snapshot(all_leagues, poll=poll)
+        print(f"Requests a la API en este refresh: {snapshot.requests_made}"
+              + (f" (juegos nuevos: {snapshot.new_games})" if snapshot.new_games is not None else ""))
+        REGISTRY.set("strike_refresh_last_upstream_requests", snapshot.requests_made)
+        if snapshot.new_games is not None:
+            REGISTRY.inc("strike_games_ingested_total", snapshot.new_games)
+            REGISTRY.set("strike_refresh_last_games_ingested", snapshot.new_games)
+        if not force_publish and snapshot.new_games == 0:
+            print("Sin juegos nuevos: se mantiene el snapshot vigente.")
+            return True
 
-        # 2) Juegos de HOY (hora Chile)
-        games_today = standings.games_played_today_scl()
+        ok = True
+        for league in all_leagues:
+            ok = _publish_league(league, snapshot, ts) and ok
+        return ok
+    except Exception as e:
+        print(f"ERROR durante la actualización del cache: {e}")
+        return False
+
+
+def _publish_league(league, snapshot, ts):
+    """Tabla + juegos de hoy de una liga desde el snapshot compartido; escribe su cache."""
+    try:
+        # 1) Tabla
+        rows = standings.compute_rows(snapshot, league)
 
-        # 3) Aplicar exclusiones manuales
-        games_today = [g for g in games_today if not _should_exclude_game(g)]
+        # 2) Juegos de HOY (hora Chile) y de todos los días (índice por día)
+        with metrics.stage("games_today"):
+            games_today = standings.games_played_today_scl(snapshot, league)
+            index = standings.day_index(snapshot, league)
+            games_by_day = {d: index.lines(d) for d in index.days()}
 
-        # 4) Escribir cache (sólo lo que necesita la web)
+        # 3) Escribir cache (sólo lo que necesita la web; las exclusiones de rules.json
+        #    ya se aplicaron al agregar los juegos)
         payload = {
             "standings": rows,
             "games_today": games_today,
             "last_updated": ts
         }
-        with open(CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+        #    (atómico + compacto + versionado; ver snapshots.py)
+        with metrics.stage("write"):
+            published = snapshots.write_snapshot(leagues.cache_file_for(league, CACHE_FILE), payload)
+            snapshots.atomic_write_bytes(leagues.cache_file_for(league, GAMES_INDEX_FILE), snapshots.encode({
+                "window": index.window,
+                "today": standings.current_day(index.window),
+                "days": games_by_day,
+                "last_updated": ts,
+            }))
+            timeline = standings.standings_timeline(snapshot, league).to_dict()
+            timeline["last_updated"] = ts
+            snapshots.atomic_write_bytes(leagues.cache_file_for(league, TIMELINE_FILE), snapshots.encode(timeline))
+            if league.id == standings.LEAGUE_ID:
+                static_page.publish_page(STATIC_PAGE_FILE, published)
 
-        print("Actualización completada exitosamente.")
+        print(f"Actualización completada exitosamente [{league.id}] (snapshot v{published['version']}).")
         return True
     except Exception as e:
-        print(f"ERROR durante la actualización del cache: {e}")
+        print(f"ERROR durante la actualización del cache [{league.id}]: {e}")
         return False
 
 
-def _run_once_then_exit():
-    ok = update_data_cache()
-    sys.exit(0 if ok else 1)
+# ===== Scheduler de sondeo por actividad =====
+def sports_day_start(now=None) -> datetime:
+    """Inicio (06:00 hora Chile) del día deportivo en curso."""
+    now = now or datetime.now(SCL)
+    start = now.replace(hour=SPORTS_DAY_START_HOUR, minute=0, second=0, microsecond=0)
+    return start - timedelta(days=1) if now < start else start
 
 
-if __name__ == "__main__":
-    # Modo 1: una sola pasada (útil en Render antes de levantar la web)
-    if "--once" in sys.argv or os.getenv("RUN_ONCE") == "1":
-        _run_once_then_exit()
+class PollScheduler:
+    """
+    Decide qué cuentas consultar en cada tick según su último juego de liga:
+    quien jugó hace poco se consulta cada ~1 min, quien no juega hace días cada 30 min.
+    El presupuesto (cuentas × tick / base_interval por tick, acumulable hasta un tick
+    redondeado hacia arriba) es el mismo volumen de requests que consultar a todos cada
+    base_interval; si hay más cuentas vencidas que presupuesto, van primero las más
+    atrasadas respecto de su propio intervalo.
+    """
+
+    def __init__(self, usernames, base_interval=300, tick=30):
+        self.base_interval = base_interval
+        self.tick = tick
+        self.credit = 0.0
+        self.usernames = []
+        self.next_due = {}
+        self.interval = {}
+        self.sync(usernames)
+
+    def sync(self, usernames):
+        """Ajusta la lista de cuentas (p.ej. una liga nueva en leagues/): las nuevas quedan vencidas."""
+        self.usernames = list(usernames)
+        for u in self.usernames:
+            self.next_due.setdefault(u, 0.0)
+            self.interval.setdefault(u, float(POLL_IDLE_SECONDS))
+        for u in set(self.next_due) - set(self.usernames):
+            del self.next_due[u], self.interval[u]
+        self.rate = len(self.usernames) * self.tick / max(1, self.base_interval)
+        self.budget = max(1, math.ceil(self.rate))
+
+    def interval_for(self, last_ts, now=None) -> int:
+        if last_ts is None:
+            return POLL_IDLE_SECONDS
+        now = time.time() if now is None else now
+        day_start = sports_day_start(datetime.fromtimestamp(now, SCL)).timestamp()
+        for max_age, interval in POLL_TIERS:
+            if (last_ts >= day_start) if max_age is None else (now - last_ts <= max_age):
+                return interval
+        return POLL_IDLE_SECONDS
+
+    def due(self, now=None):
+        """Cuentas a consultar en este tick (como mucho el crédito acumulado)."""
+        now = time.time() if now is None else now
+        self.credit = min(float(self.budget), self.credit + self.rate)
+        late = [u for u in self.usernames if self.next_due[u] <= now]
+        late.sort(key=lambda u: (now - self.next_due[u]) / self.interval[u], reverse=True)
+        late = late[: int(self.credit)]
+        self.credit -= len(late)
+        return late
+
+    def polled(self, usernames, store, now=None):
+        """Reprograma las cuentas recién consultadas según su último juego de liga en el store."""
+        now = time.time() if now is None else now
+        for u in usernames:
+            if u not in self.next_due:
+                continue
+            self.interval[u] = self.interval_for(store.last_game_ts(u, "LEAGUE"), now)
+            self.next_due[u] = now + self.interval[u]
+        # Todos los intervalos posibles (los que quedan sin cuentas en 0, no con el último conteo)
+        by_interval = dict.fromkeys([interval for _age, interval in POLL_TIERS] + [POLL_IDLE_SECONDS], 0)
+        for v in self.interval.values():
+            by_interval[int(v)] = by_interval.get(int(v), 0) + 1
+        for v, n in by_interval.items():
+            REGISTRY.set("strike_poll_users_by_interval", n, interval=v)
+
 
-    # Modo 2: bucle (local/worker)
-    UPDATE_INTERVAL_SECONDS = int(os.getenv("UPDATE_INTERVAL_SECONDS", "300"))  # 5 min
+def _reschedule(sched, usernames):
+    store = GameStore(standings.GAME_STORE_FILE)
+    try:
+        sched.polled(usernames, store)
+    finally:
+        store.close()
+
+
+def run_scheduler():
+    """
+    Bucle del worker con scheduler: cada POLL_TICK_SECONDS consulta solo las cuentas
+    vencidas y publica si entró algo nuevo; además publica al menos cada
+    UPDATE_INTERVAL_SECONDS (last_updated y "juegos de hoy" siempre al día).
+    """
+    usernames = leagues.all_usernames(leagues.load_leagues())
+    sched = PollScheduler(usernames, UPDATE_INTERVAL_SECONDS, POLL_TICK_SECONDS)
+    print(f"Scheduler: {len(usernames)} cuentas, tick {POLL_TICK_SECONDS}s, "
+          f"hasta {sched.budget} cuentas por tick.")
+    last_publish = 0.0
+    poll = list(usernames)  # primera pasada: todas las cuentas
+    while True:
+        force = time.time() - last_publish >= UPDATE_INTERVAL_SECONDS
+        if force and last_publish:
+            sched.sync(leagues.all_usernames(leagues.load_leagues()))
+        if poll or force:
+            REGISTRY.set("strike_poll_users_polled", len(poll))
+            ok = update_data_cache(poll=poll, force_publish=force)
+            if ok and force:
+                last_publish = time.time()
+            try:
+                _reschedule(sched, poll)
+            except Exception as e:
+                print(f"[WARN] no se pudo reprogramar el sondeo: {e}")
+                for u in poll:
+                    sched.next_due[u] = time.time() + UPDATE_INTERVAL_SECONDS
+        try:
+            time.sleep(POLL_TICK_SECONDS)
+        except KeyboardInterrupt:
+            print("Detenido por el usuario.")
+            break
+        poll = sched.due()
+
+
+def run_loop():
+    # Bucle con scheduler por actividad (requiere el store)
+    if POLL_SCHEDULER and standings.USE_GAME_STORE:
+        run_scheduler()
+        return
+
+    # Bucle fijo (todas las cuentas cada UPDATE_INTERVAL_SECONDS)
     while True:
         update_data_cache()
         print(f"Esperando {UPDATE_INTERVAL_SECONDS} segundos para la próxima actualización...")
@@ -110,3 +274,44 @@ if __name__ == "__main__":
         except KeyboardInterrupt:
             print("Detenido por el usuario.")
             break
+
+
+def run_refresher():
+    """
+    Corre el bucle de refresh sólo si este proceso se queda con REFRESH_LOCK_FILE;
+    si lo tiene otro (el worker o un hilo de app.py), espera y reintenta: si ese
+    proceso muere, el lock se libera y este toma el relevo.
+    """
+    lock = RefreshLock(REFRESH_LOCK_FILE)
+    announced = False
+    while not lock.acquire():
+        if not announced:
+            print(f"Otro proceso está refrescando ({REFRESH_LOCK_FILE}); "
+                  f"reintento cada {REFRESH_LOCK_RETRY_SECONDS}s.")
+            announced = True
+        time.sleep(REFRESH_LOCK_RETRY_SECONDS)
+    try:
+        run_loop()
+    finally:
+        lock.release()
+
+
+def _run_once_then_exit():
+    with RefreshLock(REFRESH_LOCK_FILE) as acquired:
+        if not acquired:
+            print("Otro proceso está refrescando; se omite esta pasada.")
+            sys.exit(0)
+        ok = update_data_cache()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    # Modo 1: una sola pasada (útil en Render antes de levantar la web)
+    if "--once" in sys.argv or os.getenv("RUN_ONCE") == "1":
+        _run_once_then_exit()
+
+    # Modo 2: bucle (local/worker); un solo refresher entre procesos
+    try:
+        run_refresher()
+    except KeyboardInterrupt:
+        print("Detenido por el usuario.")